@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add indexes backing the hot lookup predicates
+
+This migration script adds indexes for the columns the API filters on in
+almost every request:
+1. class_member (class_id, user_id) - classroom membership checks
+2. devices (mac_address) - device lookups by MAC address
+3. device_assignments (device_id, classroom_id) - one assignment per device and classroom
+4. device_assignments (classroom_id) - devices listed per classroom
+5. device_data (device_id, timestamp) - sensor history and latest reading per device
+6. anonymous_students (class_id, first_name, pin_code) - anonymous student credential checks
+7. classroom_device_data (device_id, timestamp) - classroom device history and latest reading
+8. classroom_device_assignments (assignment_type, assignment_id) - devices assigned to a student or group
+
+Stored MAC addresses are normalized to AA:BB:CC:DD:EE:FF before the indexes are built.
+
+The other hot predicates are already served by the primary keys, the unique
+constraints declared in db_models.py, and the indexes MySQL creates for foreign keys.
+Examples are device_bookmarks (user_id, device_id) and (user_id, nickname), and
+classroom_devices (classroom_id, device_name).
+
+The (device_id, timestamp) indexes serve "WHERE device_id = ? ORDER BY timestamp DESC
+LIMIT n" as a backward range scan with no sort step; InnoDB reads ascending indexes in
+either direction, so no DESC variant is needed.
+
+Existing indexes are detected and skipped, so the script can be re-run safely.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from constants import DB_HOSTNAME, DB_PORT, DB_USER, DB_PASSWORD, DB_DATABASE
+
+# Database connection
+# Extract hostname from DB_HOSTNAME (remove protocol and port if present)
+hostname = DB_HOSTNAME.replace('http://', '').replace('https://', '').split(':')[0]
+DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{hostname}:{DB_PORT}/{DB_DATABASE}"
+
+# (table, index name, column list, unique)
+INDEXES = [
+    ("class_member", "ix_class_member_class_user", "class_id, user_id", False),
+    ("devices", "ux_devices_mac_address", "mac_address", True),
+    ("device_assignments", "unique_device_classroom_assignment", "device_id, classroom_id", True),
+    ("device_assignments", "idx_device_assignment_classroom", "classroom_id", False),
+    ("device_data", "idx_device_data_device_timestamp", "device_id, timestamp", False),
+    ("anonymous_students", "ix_anonymous_students_login", "class_id, first_name, pin_code", False),
+    ("classroom_device_data", "idx_classroom_device_timestamp", "device_id, timestamp", False),
+    ("classroom_device_assignments", "idx_classroom_device_assignment_target", "assignment_type, assignment_id", False),
+]
+
+def table_exists(conn, table):
+    result = conn.execute(text("""
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table
+    """), {"table": table})
+    return result.scalar() > 0
+
+def index_exists(conn, table, index_name):
+    result = conn.execute(text("""
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table
+        AND INDEX_NAME = :index_name
+    """), {"table": table, "index_name": index_name})
+    return result.scalar() > 0
+
+def run_migration():
+    """Create the performance indexes that do not exist yet."""
+    engine = create_engine(DATABASE_URL)
+
+    with engine.connect() as conn:
+        print("Starting performance index migration...")
+
+        # MAC addresses are stored as AA:BB:CC:DD:EE:FF; rewrite older rows first so
+        # lookups match and the unique index sees equal addresses as duplicates
+        if table_exists(conn, "devices"):
+            print("0. Normalizing stored MAC addresses...")
+            result = conn.execute(text("""
+                UPDATE devices
+                SET mac_address = UPPER(REPLACE(mac_address, '-', ':'))
+                WHERE mac_address REGEXP '^([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}$'
+                AND BINARY mac_address <> BINARY UPPER(REPLACE(mac_address, '-', ':'))
+            """))
+            conn.commit()
+            print(f"   ✅ {result.rowcount} MAC addresses normalized")
+
+        for step, (table, index_name, columns, unique) in enumerate(INDEXES, start=1):
+            print(f"{step}. {index_name} on {table} ({columns})...")
+
+            if not table_exists(conn, table):
+                print(f"   ⚠️  table {table} does not exist, skipping")
+                continue
+
+            if index_exists(conn, table, index_name):
+                print(f"   ⚠️  {index_name} already exists")
+                continue
+
+            try:
+                kind = "UNIQUE INDEX" if unique else "INDEX"
+                conn.execute(text(f"CREATE {kind} {index_name} ON {table} ({columns})"))
+                conn.commit()
+                print(f"   ✅ {index_name} created")
+            except Exception as e:
+                conn.rollback()
+                print(f"   ❌ Could not create {index_name}: {e}")
+
+        print("✅ Migration completed!")
+
+def rollback_migration():
+    """Drop the performance indexes."""
+    engine = create_engine(DATABASE_URL)
+
+    with engine.connect() as conn:
+        print("Rolling back performance index migration...")
+
+        for step, (table, index_name, columns, unique) in enumerate(INDEXES, start=1):
+            print(f"{step}. Removing {index_name}...")
+            try:
+                conn.execute(text(f"DROP INDEX {index_name} ON {table}"))
+                conn.commit()
+                print(f"   ✅ {index_name} removed")
+            except Exception as e:
+                conn.rollback()
+                print(f"   ⚠️  Could not remove {index_name}: {e}")
+
+        print("✅ Rollback completed!")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Performance Index Migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    else:
+        run_migration()
@@ -0,0 +1,59 @@
+# cache.py
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Small thread-safe in-process cache with per-entry expiry.
+
+    The database stays the source of truth; entries are dropped after `ttl`
+    seconds or explicitly on writes so other workers converge quickly.
+
+    Invalidation is a dict pop under a lock, so writers call delete() inline
+    right after commit; deferring it to a background task would save nothing
+    and leave a window where the response has gone out but the stale entry is
+    still served.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (value, time.monotonic() + self.ttl)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# normalized MAC address -> public device payload served by GET /device/mac/{mac_address}
+devices_by_mac = TTLCache(ttl=60)
+
+# Device.id -> device payload served by GET /device/{device_id} (nickname filled in per caller)
+devices_by_id = TTLCache(ttl=60)
+
+# Device.id -> newest sensor reading as served by the latest-data endpoints; dropped by every
+# reading upload, the short TTL bounds staleness across workers
+latest_readings = TTLCache(ttl=10)
@@ -17,7 +17,19 @@ DB_USER: str = os.environ.get('DB_USER')
 DB_PASSWORD: str = os.environ.get('DB_PASSWORD')
 DB_DATABASE: str = os.environ.get('DB_DATABASE')
 
+# Connection pool per worker process. With several workers, keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's max_connections.
+DB_POOL_SIZE: int = int(os.environ.get('DB_POOL_SIZE', '40'))
+DB_MAX_OVERFLOW: int = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT: int = int(os.environ.get('DB_POOL_TIMEOUT', '10'))
+# Seconds before a pooled connection is replaced; keep it under MySQL's wait_timeout and
+# any idle timeout on the network path (NAT gateways, proxies) so stale sockets aren't handed out
+DB_POOL_RECYCLE: int = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+
 # JWT Configuration
 SECRET_KEY: str = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 ALGORITHM: str = os.environ.get('ALGORITHM', 'HS256')
-ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
+
+# Development/CI guard: make unexpected lazy relationship loads raise instead of silently issuing N+1 queries
+STRICT_LOADING: bool = os.environ.get('STRICT_LOADING', 'false').lower() in ('1', 'true', 'yes')
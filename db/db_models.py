@@ -54,6 +54,11 @@ class ClassMember(Base):
     class_obj = relationship("Class", back_populates="members")
     user = relationship("User", back_populates="class_memberships")
 
+    # Membership checks filter on both columns
+    __table_args__ = (
+        Index('ix_class_member_class_user', 'class_id', 'user_id'),
+    )
+
 def generate_passphrase(length=8):
     """Generate an easy-to-type unique passphrase"""
     # Use only letters and numbers, avoiding confusing characters
@@ -86,9 +91,11 @@ class AnonymousStudent(Base):
     # Relationships
     class_obj = relationship("Class", backref="anonymous_students")
 
-    # Ensure unique combination of class_id and first_name
+    # Ensure unique combination of class_id and first_name; the login index covers the
+    # (class, name, PIN) credential check so it is answered from the index alone
     __table_args__ = (
         UniqueConstraint('class_id', 'first_name', name='unique_name_per_classroom'),
+        Index('ix_anonymous_students_login', 'class_id', 'first_name', 'pin_code'),
     )
 
 
@@ -163,9 +170,10 @@ class ClassroomDeviceAssignment(Base):
     # Relationships
     device = relationship("ClassroomDevice", back_populates="assignments")
 
-    # Ensure one assignment per device
+    # Ensure one assignment per device; the student dashboards look devices up by assignee
     __table_args__ = (
         UniqueConstraint('device_id', name='unique_device_assignment'),
+        Index('idx_classroom_device_assignment_target', 'assignment_type', 'assignment_id'),
     )
 
 class ClassroomDeviceData(Base):
@@ -190,3 +198,85 @@ class ClassroomDeviceData(Base):
     __table_args__ = (
         Index('idx_classroom_device_timestamp', 'device_id', 'timestamp'),
     )
+
+# Global device registry used by routes/device.py and routes/data.py
+# (devices are shared; teachers keep per-user bookmarks and assign devices to classrooms)
+class Device(Base):
+    __tablename__ = "devices"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    mac_address = Column(String(17), nullable=False)  # AA:BB:CC:DD:EE:FF or generated BLE identifier
+    is_active = Column(Boolean, default=False)
+    battery_level = Column(Integer, default=0)
+    last_seen = Column(DateTime(timezone=True), nullable=True)
+    device_type = Column(String(10), default="ble")
+    description = Column(String(200), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    bookmarks = relationship("DeviceBookmark", back_populates="device", cascade="all, delete-orphan")
+    assignments = relationship("DeviceAssignment", back_populates="device", cascade="all, delete-orphan")
+    data = relationship("DeviceData", back_populates="device", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ux_devices_mac_address', 'mac_address', unique=True),
+    )
+
+class DeviceBookmark(Base):
+    __tablename__ = "device_bookmarks"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    device_id = Column(String(36), ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String(64), ForeignKey("user.user_id", ondelete="CASCADE"), nullable=False)
+    nickname = Column(String(50), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    device = relationship("Device", back_populates="bookmarks")
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'device_id', name='unique_user_device_bookmark'),
+        UniqueConstraint('user_id', 'nickname', name='unique_user_nickname'),
+    )
+
+class DeviceAssignment(Base):
+    __tablename__ = "device_assignments"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    device_id = Column(String(36), ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    classroom_id = Column(String(36), ForeignKey("class.id", ondelete="CASCADE"), nullable=False)
+    assignment_type = Column(String(20), nullable=False)  # 'unassigned', 'student', 'group', 'public'
+    assignment_id = Column(String(255), nullable=True)  # student_id or group_id
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    device = relationship("Device", back_populates="assignments")
+    classroom = relationship("Class")
+
+    __table_args__ = (
+        UniqueConstraint('device_id', 'classroom_id', name='unique_device_classroom_assignment'),
+        Index('idx_device_assignment_classroom', 'classroom_id'),
+    )
+
+class DeviceData(Base):
+    __tablename__ = "device_data"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    device_id = Column(String(36), ForeignKey("devices.id", ondelete="CASCADE"), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    temperature = Column(Numeric(5, 2), nullable=True)  # Temperature in Celsius
+    thermometer = Column(Numeric(5, 2), nullable=True)  # Thermometer reading in Celsius
+    humidity = Column(Numeric(5, 2), nullable=True)    # Humidity percentage
+    moisture = Column(Numeric(5, 2), nullable=True)    # Soil moisture percentage
+    light = Column(Numeric(8, 2), nullable=True)       # Light level in lux
+    sound = Column(Numeric(5, 2), nullable=True)       # Sound level in dB
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    device = relationship("Device", back_populates="data")
+
+    __table_args__ = (
+        Index('idx_device_data_device_timestamp', 'device_id', 'timestamp'),
+    )
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import QueuePool
-from constants import DB_HOSTNAME, DB_PASSWORD, DB_PORT, DB_USER, DB_DATABASE
+from constants import (
+    DB_HOSTNAME, DB_PASSWORD, DB_PORT, DB_USER, DB_DATABASE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+)
 import os
 
 # Use SQLite for local development if no database credentials are provided
@@ -14,6 +17,10 @@ else:
     hostname = DB_HOSTNAME.replace('http://', '').replace('https://', '').split(':')[0]
     URL_DATABASE = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{hostname}:{DB_PORT}/{DB_DATABASE}'
 
+# Worker threads FastAPI uses for sync (def) routes and dependencies. Each in-flight
+# request holds at most one connection, so this matches the pool size.
+THREADPOOL_SIZE = DB_POOL_SIZE
+
 # Configure engine based on database type
 if URL_DATABASE.startswith('sqlite'):
     # SQLite configuration
@@ -28,20 +35,28 @@ else:
     engine = create_engine(
         URL_DATABASE,
         poolclass=QueuePool,
-        pool_size=5,               # Number of persistent connections
-        max_overflow=10,           # Max connections beyond pool_size
-        pool_timeout=30,           # Seconds to wait for a connection
-        pool_recycle=3600,         # Recycle connections after 1 hour
+        pool_size=DB_POOL_SIZE,    # One persistent connection per worker thread
+        max_overflow=DB_MAX_OVERFLOW,  # Headroom for sessions held past the handler (streamed responses)
+        pool_timeout=DB_POOL_TIMEOUT,  # Seconds to wait for a connection before failing the request
+        pool_recycle=DB_POOL_RECYCLE,  # Replace connections before the server or network drops them
         pool_pre_ping=True,        # Test connections before use
+        pool_use_lifo=True,        # Reuse the most recent connection; spares above the load stay idle and get recycled
+        insertmanyvalues_page_size=1000,  # Rows per batched multi-row INSERT ... VALUES
         connect_args={
-            'connect_timeout': 10  # Connection timeout in seconds
+            'connect_timeout': 10,  # Connection timeout in seconds
+            'read_timeout': 30,     # Give up on a query whose result hasn't arrived in 30 seconds
+            'write_timeout': 30
         },
         echo=False,                # Set True to log SQL queries
         future=True,               # SQLAlchemy 2.0 compatibility
         isolation_level="REPEATABLE READ"  # MySQL default isolation level
     )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# One session per request (see get_db). A thread-local scoped_session is not safe here:
+# FastAPI may run the dependency and the handler on different threadpool threads, and
+# async handlers all share the event loop thread. Objects are not expired on commit,
+# so building a response after commit doesn't re-SELECT rows the request just wrote.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
 import routes.user as user
 import routes.class_management as class_management
@@ -6,8 +8,20 @@ import routes.classroom_device as classroom_device
 import routes.group as group
 import routes.data as data
 from fastapi.middleware.cors import CORSMiddleware
+from utils import error_response, ORJSONResponse, TransactionError
+from db.init_engine import THREADPOOL_SIZE
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync routes run in anyio's worker threads; keep that limit in step with the DB pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+@app.exception_handler(TransactionError)
+async def transaction_error_handler(request, exc: TransactionError):
+    return error_response(exc.status_code, exc.message, error_code=exc.status_code)
 
 # List the exact origins your frontend will be accessed from
 # For example:
@@ -52,7 +66,6 @@ app.include_router(data.router)
 
 @app.get("/")
 def read_root():
-    print("this is root")
     return {"message": "P-Bit WebApp Backend API"}
 
 @app.get("/health")
@@ -1,7 +1,9 @@
 # auth.py
+import hmac
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import select, bindparam
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
@@ -12,6 +14,10 @@ from constants import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
+# Built once at import: every authenticated request runs this lookup, so it reuses the
+# same statement object (and its compiled SQL) instead of rebuilding the query each time
+_USER_BY_ID = select(db_models.User).where(db_models.User.user_id == bindparam("user_id"))
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -21,7 +27,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 # Dependency: Extract current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# (plain def: the user lookup is a blocking query, so FastAPI runs it in the threadpool)
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -35,7 +42,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(db_models.User).filter(db_models.User.user_id == user_id).first()
+    user = db.execute(_USER_BY_ID, {"user_id": user_id}).scalar_one_or_none()
     if not user:
         raise credentials_exception
     return user
+
+
+# Anonymous students authenticate on every request with class, first name and PIN.
+# Not cached: an in-process cache could not be invalidated in the other workers, so a
+# changed PIN or a removed student would keep working there until the entry expired.
+def get_anonymous_student_id(db: Session, class_id: str, first_name: str, pin_code: str) -> Optional[str]:
+    # (class_id, first_name) is unique, so this is a single-row probe; the PIN is compared
+    # here in constant time instead of in the WHERE clause
+    student = db.query(db_models.AnonymousStudent.student_id, db_models.AnonymousStudent.pin_code).filter(
+        db_models.AnonymousStudent.class_id == class_id,
+        db_models.AnonymousStudent.first_name == first_name
+    ).first()
+    if student is not None and hmac.compare_digest(student.pin_code.encode(), pin_code.encode()):
+        return student.student_id
+    return None
+
+
+# Classroom ownership decides most teacher-only routes. Looked up per request (a primary key
+# probe) rather than cached in-process, where other workers would keep a deleted class alive.
+def get_classroom_owner_id(db: Session, classroom_id: str) -> Optional[str]:
+    """Owner of the classroom, or None if it doesn't exist."""
+    return db.query(db_models.Class.owner_id).filter(
+        db_models.Class.id == classroom_id
+    ).scalar()
@@ -1,22 +1,25 @@
 from fastapi import APIRouter, Depends, status, Query, Request
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import desc, insert, select, exists
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
 from typing import Optional, List
-import uuid
 from datetime import datetime
 
 from db.init_engine import get_db
 from db import db_models
 from utils import (
-    api_resp, error_resp, 
+    uuid7, api_resp, error_response, success_response, ORJSONResponse, db_txn, strict_load, unique_violation, reading_columns, json_body, json_body_docs,
     validate_assignment_type
 )
-from middleware import get_current_user
+from middleware import get_current_user, get_anonymous_student_id, get_classroom_owner_id
 
 router = APIRouter(prefix="/classroom-device")
 
+# Sensor readings are only serialized, never modified: select plain column rows
+# instead of hydrating an ORM instance per reading
+_READING_COLUMNS = reading_columns(db_models.ClassroomDeviceData)
+
 # Pydantic models for request/response
 class ClassroomDeviceAdd(BaseModel):
     device_name: str = Field(..., min_length=1, max_length=100)
@@ -38,71 +41,64 @@ class BLEDataReading(BaseModel):
     battery_level: Optional[float] = Field(None, ge=0, le=100)
 
 class BLEBatchRecord(BaseModel):
-    readings: List[BLEDataReading] = Field(..., min_items=1, max_items=100)
+    readings: List[BLEDataReading] = Field(..., min_length=1, max_length=100)
 
 # Get classroom devices
 @router.get("/classroom/{classroom_id}/devices", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_classroom_devices(
+def get_classroom_devices(
     classroom_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all devices for a classroom"""
     # Check if user has access to the classroom
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == classroom_id
-    ).first()
+    owner_id = get_classroom_owner_id(db, classroom_id)
     
-    if not classroom:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Classroom not found",
-                error_type="classroom_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    if not owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
     
     # Check if user is teacher (owner) or student member
-    is_teacher = classroom.owner_id == current_user.user_id
-    is_student = db.query(db_models.ClassMember).filter(
+    # (the membership query only runs for non-owners)
+    is_teacher = owner_id == current_user.user_id
+    is_student = not is_teacher and db.query(db.query(db_models.ClassMember).filter(
         db_models.ClassMember.class_id == classroom_id,
         db_models.ClassMember.user_id == current_user.user_id
-    ).first() is not None
+    ).exists()).scalar()
     
     if not (is_teacher or is_student):
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Access denied to classroom",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Access denied to classroom", error_type="unauthorized")
     
-    # Get all devices for this classroom
-    devices = db.query(db_models.ClassroomDevice).filter(
+    # Get all devices for this classroom, with their assignments and the teacher
+    # who added them loaded up front instead of one query per device
+    devices = db.query(db_models.ClassroomDevice).options(*strict_load(
+        selectinload(db_models.ClassroomDevice.assignments),
+        joinedload(db_models.ClassroomDevice.added_by_user)
+    )).filter(
         db_models.ClassroomDevice.classroom_id == classroom_id
     ).all()
     
+    # Names of the students who added devices, in one query
+    student_ids = {
+        device.added_by_student_id for device in devices
+        if device.added_by_type == "student" and device.added_by_student_id
+    }
+    student_names = dict(
+        db.query(db_models.AnonymousStudent.student_id, db_models.AnonymousStudent.first_name).filter(
+            db_models.AnonymousStudent.student_id.in_(student_ids)
+        ).all()
+    ) if student_ids else {}
+    
     devices_data = []
     for device in devices:
         # Get assignment info
-        assignment = db.query(db_models.ClassroomDeviceAssignment).filter(
-            db_models.ClassroomDeviceAssignment.device_id == device.id
-        ).first()
+        assignment = device.assignments[0] if device.assignments else None
         
         # Get added by info
         added_by_name = "Unknown"
         if device.added_by_type == "teacher" and device.added_by_user:
             added_by_name = f"{device.added_by_user.first_name} {device.added_by_user.last_name}"
-        elif device.added_by_type == "student" and device.added_by_student_id:
-            # Get student info
-            student = db.query(db_models.AnonymousStudent).filter(
-                db_models.AnonymousStudent.student_id == device.added_by_student_id
-            ).first()
-            if student:
-                added_by_name = f"Student {student.first_name}"
+        elif device.added_by_type == "student" and device.added_by_student_id in student_names:
+            added_by_name = f"Student {student_names[device.added_by_student_id]}"
         
         devices_data.append({
             "id": device.id,
@@ -110,7 +106,7 @@ async def get_classroom_devices(
             "device_type": device.device_type,
             "is_active": device.is_active,
             "battery_level": device.battery_level,
-            "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+            "last_seen": device.last_seen,
             "added_by": {
                 "type": device.added_by_type,
                 "name": added_by_name
@@ -119,21 +115,18 @@ async def get_classroom_devices(
                 "type": assignment.assignment_type if assignment else "public",
                 "id": assignment.assignment_id if assignment else None
             },
-            "created_at": device.created_at.isoformat()
+            "created_at": device.created_at
         })
     
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="Classroom devices retrieved successfully",
-            data=devices_data
-        ).dict(),
+    return success_response(
+        message="Classroom devices retrieved successfully",
+        data=devices_data,
         status_code=status.HTTP_200_OK,
     )
 
 # Add device to classroom
 @router.post("/classroom/{classroom_id}/add", tags=["classroom-device"], status_code=status.HTTP_201_CREATED)
-async def add_device_to_classroom(
+def add_device_to_classroom(
     classroom_id: str,
     payload: ClassroomDeviceAdd,
     current_user: db_models.User = Depends(get_current_user),
@@ -143,118 +136,74 @@ async def add_device_to_classroom(
     # Validate assignment type
     is_valid_type, type_error = validate_assignment_type(payload.assignment_type)
     if not is_valid_type:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=type_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, type_error, error_type="validation_error")
     
     # Check if classroom exists
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == classroom_id
-    ).first()
+    owner_id = get_classroom_owner_id(db, classroom_id)
     
-    if not classroom:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Classroom not found",
-                error_type="classroom_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    if not owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
     
     # Check if user has access to classroom
-    is_teacher = classroom.owner_id == current_user.user_id
-    is_student = db.query(db_models.ClassMember).filter(
+    # (the membership query only runs for non-owners)
+    is_teacher = owner_id == current_user.user_id
+    is_student = not is_teacher and db.query(db.query(db_models.ClassMember).filter(
         db_models.ClassMember.class_id == classroom_id,
         db_models.ClassMember.user_id == current_user.user_id
-    ).first() is not None
+    ).exists()).scalar()
     
     if not (is_teacher or is_student):
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Access denied to classroom",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Access denied to classroom", error_type="unauthorized")
     
-    # Check if device with this name already exists in classroom
-    existing_device = db.query(db_models.ClassroomDevice).filter(
-        db_models.ClassroomDevice.classroom_id == classroom_id,
-        db_models.ClassroomDevice.device_name == payload.device_name
-    ).first()
+    device_id = uuid7()
+    name_taken = False
+    with db_txn(db, "Failed to add device"):
+        try:
+            # Create new classroom device; the (classroom_id, device_name) unique constraint rejects
+            # a name that is already taken (even by a concurrent request) instead of a pre-check query
+            db.execute(insert(db_models.ClassroomDevice).values(
+                id=device_id,
+                classroom_id=classroom_id,
+                device_name=payload.device_name,
+                device_type="ble",
+                is_active=True,
+                battery_level=0,
+                last_seen=datetime.utcnow(),
+                added_by_user_id=current_user.user_id if is_teacher else None,
+                added_by_student_id=None,  # Will be set for anonymous students
+                added_by_type="teacher" if is_teacher else "student"
+            ))
+        except IntegrityError as e:
+            # Any other integrity failure is left to db_txn
+            if not unique_violation(e, db_models.ClassroomDevice, "unique_device_name_per_classroom"):
+                raise
+            name_taken = True
+        else:
+            # Create assignment
+            db.execute(insert(db_models.ClassroomDeviceAssignment).values(
+                id=uuid7(),
+                device_id=device_id,
+                assignment_type=payload.assignment_type,
+                assignment_id=payload.assignment_id
+            ))
     
-    if existing_device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Device '{payload.device_name}' is already connected to this classroom. Please talk to your teacher or choose a different device.",
-                error_type="device_already_exists"
-            ).dict(),
-            status_code=status.HTTP_409_CONFLICT,
-        )
+    if name_taken:
+        return error_response(status.HTTP_409_CONFLICT, f"Device '{payload.device_name}' is already connected to this classroom. Please talk to your teacher or choose a different device.", error_type="device_already_exists", cache=False)
     
-    try:
-        # Create new classroom device
-        new_device = db_models.ClassroomDevice(
-            id=str(uuid.uuid4()),
-            classroom_id=classroom_id,
-            device_name=payload.device_name,
-            device_type="ble",
-            is_active=True,
-            battery_level=0,
-            last_seen=datetime.utcnow(),
-            added_by_user_id=current_user.user_id if is_teacher else None,
-            added_by_student_id=None,  # Will be set for anonymous students
-            added_by_type="teacher" if is_teacher else "student"
-        )
-        db.add(new_device)
-        db.flush()  # Get the ID
-        
-        # Create assignment
-        new_assignment = db_models.ClassroomDeviceAssignment(
-            id=str(uuid.uuid4()),
-            device_id=new_device.id,
-            assignment_type=payload.assignment_type,
-            assignment_id=payload.assignment_id
-        )
-        db.add(new_assignment)
-        db.commit()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device added to classroom successfully",
-                data={
-                    "device_id": new_device.id,
-                    "device_name": new_device.device_name,
-                    "assignment_type": payload.assignment_type,
-                    "assignment_id": payload.assignment_id
-                }
-            ).dict(),
-            status_code=status.HTTP_201_CREATED,
-        )
-    except Exception as e:
-        db.rollback()
-        print(f"Error adding device to classroom: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to add device: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    return success_response(
+        message="Device added to classroom successfully",
+        data={
+            "device_id": device_id,
+            "device_name": payload.device_name,
+            "assignment_type": payload.assignment_type,
+            "assignment_id": payload.assignment_id
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
 
 # Add device to classroom (anonymous student)
 @router.post("/classroom/{classroom_id}/add-anonymous", tags=["classroom-device"], status_code=status.HTTP_201_CREATED)
-async def add_device_to_classroom_anonymous(
+def add_device_to_classroom_anonymous(
     classroom_id: str,
     payload: ClassroomDeviceAdd,
     first_name: str = Query(..., description="Student first name"),
@@ -263,103 +212,61 @@ async def add_device_to_classroom_anonymous(
 ):
     """Add a BLE device to classroom by anonymous student"""
     # Verify anonymous student
-    anonymous_student = db.query(db_models.AnonymousStudent).filter(
-        db_models.AnonymousStudent.class_id == classroom_id,
-        db_models.AnonymousStudent.first_name == first_name,
-        db_models.AnonymousStudent.pin_code == pin_code
-    ).first()
+    student_id = get_anonymous_student_id(db, classroom_id, first_name, pin_code)
     
-    if not anonymous_student:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Invalid student credentials",
-                error_type="authentication_error"
-            ).dict(),
-            status_code=status.HTTP_401_UNAUTHORIZED,
-        )
+    if not student_id:
+        return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_type="authentication_error")
     
     # Anonymous students can only add public devices
     if payload.assignment_type != "public":
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Anonymous students can only add public devices",
-                error_type="invalid_assignment_type"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, "Anonymous students can only add public devices", error_type="invalid_assignment_type")
     
-    # Check if device already exists
-    existing_device = db.query(db_models.ClassroomDevice).filter(
-        db_models.ClassroomDevice.classroom_id == classroom_id,
-        db_models.ClassroomDevice.device_name == payload.device_name
-    ).first()
+    device_id = uuid7()
+    name_taken = False
+    with db_txn(db, "Failed to add device"):
+        try:
+            # Create new classroom device unless the name is already taken in this classroom
+            db.execute(insert(db_models.ClassroomDevice).values(
+                id=device_id,
+                classroom_id=classroom_id,
+                device_name=payload.device_name,
+                device_type="ble",
+                is_active=True,
+                battery_level=0,
+                last_seen=datetime.utcnow(),
+                added_by_user_id=None,
+                added_by_student_id=student_id,
+                added_by_type="anonymous"
+            ))
+        except IntegrityError as e:
+            if not unique_violation(e, db_models.ClassroomDevice, "unique_device_name_per_classroom"):
+                raise
+            name_taken = True
+        else:
+            # Create public assignment
+            db.execute(insert(db_models.ClassroomDeviceAssignment).values(
+                id=uuid7(),
+                device_id=device_id,
+                assignment_type="public",
+                assignment_id=None
+            ))
     
-    if existing_device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Device '{payload.device_name}' is already connected to this classroom. Please talk to your teacher or choose a different device.",
-                error_type="device_already_exists"
-            ).dict(),
-            status_code=status.HTTP_409_CONFLICT,
-        )
+    if name_taken:
+        return error_response(status.HTTP_409_CONFLICT, f"Device '{payload.device_name}' is already connected to this classroom. Please talk to your teacher or choose a different device.", error_type="device_already_exists", cache=False)
     
-    try:
-        # Create new classroom device
-        new_device = db_models.ClassroomDevice(
-            id=str(uuid.uuid4()),
-            classroom_id=classroom_id,
-            device_name=payload.device_name,
-            device_type="ble",
-            is_active=True,
-            battery_level=0,
-            last_seen=datetime.utcnow(),
-            added_by_user_id=None,
-            added_by_student_id=anonymous_student.student_id,
-            added_by_type="anonymous"
-        )
-        db.add(new_device)
-        db.flush()
-        
-        # Create public assignment
-        new_assignment = db_models.ClassroomDeviceAssignment(
-            id=str(uuid.uuid4()),
-            device_id=new_device.id,
-            assignment_type="public",
-            assignment_id=None
-        )
-        db.add(new_assignment)
-        db.commit()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device added to classroom successfully",
-                data={
-                    "device_id": new_device.id,
-                    "device_name": new_device.device_name,
-                    "assignment_type": "public"
-                }
-            ).dict(),
-            status_code=status.HTTP_201_CREATED,
-        )
-    except Exception as e:
-        db.rollback()
-        print(f"Error adding device to classroom: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to add device: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    return success_response(
+        message="Device added to classroom successfully",
+        data={
+            "device_id": device_id,
+            "device_name": payload.device_name,
+            "assignment_type": "public"
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
 
 # Update device assignment (teacher only)
 @router.put("/{device_id}/assignment", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def update_device_assignment(
+def update_device_assignment(
     device_id: str,
     payload: ClassroomDeviceUpdate,
     current_user: db_models.User = Depends(get_current_user),
@@ -369,14 +276,7 @@ async def update_device_assignment(
     # Validate assignment type
     is_valid_type, type_error = validate_assignment_type(payload.assignment_type)
     if not is_valid_type:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=type_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, type_error, error_type="validation_error")
     
     # Get device
     device = db.query(db_models.ClassroomDevice).filter(
@@ -384,31 +284,13 @@ async def update_device_assignment(
     ).first()
     
     if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
     # Check if user is teacher of this classroom
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == device.classroom_id
-    ).first()
-    
-    if not classroom or classroom.owner_id != current_user.user_id:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Only classroom teacher can update device assignments",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
+    if get_classroom_owner_id(db, device.classroom_id) != current_user.user_id:
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Only classroom teacher can update device assignments", error_type="unauthorized")
     
-    try:
+    with db_txn(db, "Failed to update device assignment"):
         # Update or create assignment
         assignment = db.query(db_models.ClassroomDeviceAssignment).filter(
             db_models.ClassroomDeviceAssignment.device_id == device_id
@@ -419,43 +301,26 @@ async def update_device_assignment(
             assignment.assignment_id = payload.assignment_id
             assignment.updated_at = datetime.utcnow()
         else:
-            new_assignment = db_models.ClassroomDeviceAssignment(
-                id=str(uuid.uuid4()),
+            db.add(db_models.ClassroomDeviceAssignment(
+                id=uuid7(),
                 device_id=device_id,
                 assignment_type=payload.assignment_type,
                 assignment_id=payload.assignment_id
-            )
-            db.add(new_assignment)
-        
-        db.commit()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device assignment updated successfully",
-                data={
-                    "device_id": device_id,
-                    "assignment_type": payload.assignment_type,
-                    "assignment_id": payload.assignment_id
-                }
-            ).dict(),
-            status_code=status.HTTP_200_OK,
-        )
-    except Exception as e:
-        db.rollback()
-        print(f"Error updating device assignment: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to update device assignment: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+            ))
+    
+    return success_response(
+        message="Device assignment updated successfully",
+        data={
+            "device_id": device_id,
+            "assignment_type": payload.assignment_type,
+            "assignment_id": payload.assignment_id
+        },
+        status_code=status.HTTP_200_OK,
+    )
 
 # Remove device from classroom (teacher only)
 @router.delete("/{device_id}", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def remove_device_from_classroom(
+def remove_device_from_classroom(
     device_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -467,59 +332,29 @@ async def remove_device_from_classroom(
     ).first()
     
     if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
     # Check if user is teacher of this classroom
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == device.classroom_id
-    ).first()
+    if get_classroom_owner_id(db, device.classroom_id) != current_user.user_id:
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Only classroom teacher can remove devices", error_type="unauthorized")
     
-    if not classroom or classroom.owner_id != current_user.user_id:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Only classroom teacher can remove devices",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
-    
-    try:
+    with db_txn(db, "Failed to remove device"):
         # Delete device (cascade will handle assignments and data)
         db.delete(device)
-        db.commit()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device removed from classroom successfully"
-            ).dict(),
-            status_code=status.HTTP_200_OK,
-        )
-    except Exception as e:
-        db.rollback()
-        print(f"Error removing device: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to remove device: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    
+    return success_response(
+        message="Device removed from classroom successfully",
+        status_code=status.HTTP_200_OK,
+    )
+
+# Success envelope for the BLE ingest path, built once instead of an api_resp model per batch
+_BLE_BATCH_OK = api_resp(success=True, message="").model_dump()
 
 # Record BLE batch data
-@router.post("/record-ble-batch", tags=["classroom-device"], status_code=status.HTTP_201_CREATED)
-async def record_ble_batch(
+@router.post("/record-ble-batch", tags=["classroom-device"], status_code=status.HTTP_201_CREATED, openapi_extra=json_body_docs(BLEBatchRecord))
+def record_ble_batch(
     request: Request,
-    payload: BLEBatchRecord,
+    payload: BLEBatchRecord = Depends(json_body(BLEBatchRecord)),
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -530,136 +365,123 @@ async def record_ble_batch(
         classroom_id = request.headers.get('X-Classroom-ID')
         
         if not classroom_id:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Classroom ID required",
-                    error_type="missing_classroom_id"
-                ).dict(),
-                status_code=status.HTTP_400_BAD_REQUEST,
-            )
+            return error_response(status.HTTP_400_BAD_REQUEST, "Classroom ID required", error_type="missing_classroom_id")
         
         # Validate classroom access for the current user
-        classroom = db.query(db_models.Class).filter(
-            db_models.Class.id == classroom_id
-        ).first()
+        owner_id = get_classroom_owner_id(db, classroom_id)
 
-        if not classroom:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Classroom not found",
-                    error_type="classroom_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        if not owner_id:
+            return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
 
         # Check if user has access to this classroom
         has_access = False
 
         # Check if user is the classroom owner
-        if classroom.owner_id == current_user.user_id:
+        if owner_id == current_user.user_id:
             has_access = True
 
         # Check if user is a member of the classroom
         elif current_user.user_type == db_models.UserType.STUDENT:
-            membership = db.query(db_models.ClassMember).filter(
+            has_access = db.query(db.query(db_models.ClassMember).filter(
                 db_models.ClassMember.class_id == classroom_id,
                 db_models.ClassMember.user_id == current_user.user_id
-            ).first()
-            if membership:
-                has_access = True
-
-        # Check if user is anonymous and has valid PIN for this classroom
-        elif current_user.user_type == db_models.UserType.ANONYMOUS:
-            # Anonymous users should have a valid PIN for this classroom
-            if hasattr(current_user, 'pin_code') and current_user.pin_code:
-                # This is a simplified check - in production you'd want more sophisticated validation
-                has_access = True
+            ).exists()).scalar()
 
         if not has_access:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied to classroom",
-                    error_type="access_denied"
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied to classroom", error_type="access_denied")
 
-        # Find the classroom device
-        device = db.query(db_models.ClassroomDevice).filter(
+        # Find the classroom device; resolved per batch (an index probe on the (classroom_id,
+        # device_name) unique key) so a device removed or re-added in another worker is never stale
+        device_id = db.query(db_models.ClassroomDevice.id).filter(
             db_models.ClassroomDevice.classroom_id == classroom_id,
             db_models.ClassroomDevice.device_name == device_name
-        ).first()
+        ).scalar()
 
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Classroom device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
-        
-        # Record each reading
-        recorded_count = 0
-        for reading in payload.readings:
-            try:
-                new_data = db_models.ClassroomDeviceData(
-                    id=str(uuid.uuid4()),
-                    device_id=device.id,
-                    timestamp=reading.timestamp,
-                    temperature=reading.temperature,
-                    thermometer=reading.thermometer,
-                    humidity=reading.humidity,
-                    moisture=reading.moisture,
-                    light=reading.light,
-                    sound=reading.sound,
-                    battery_level=reading.battery_level
-                )
-                db.add(new_data)
-                recorded_count += 1
-            except Exception as e:
-                print(f"Error recording individual reading: {e}")
-                continue
+        if not device_id:
+            return error_response(status.HTTP_404_NOT_FOUND, "Classroom device not found", error_type="device_not_found")
+        
+        # Record the whole batch with a single multi-row INSERT
+        rows = [
+            {
+                "id": uuid7(),
+                "device_id": device_id,
+                "timestamp": reading.timestamp,
+                "temperature": reading.temperature,
+                "thermometer": reading.thermometer,
+                "humidity": reading.humidity,
+                "moisture": reading.moisture,
+                "light": reading.light,
+                "sound": reading.sound,
+                "battery_level": reading.battery_level
+            }
+            for reading in payload.readings
+        ]
+        db.execute(insert(db_models.ClassroomDeviceData), rows)
+        recorded_count = len(rows)
         
         # Update device status
         if payload.readings and payload.readings[-1].battery_level is not None:
-            device.battery_level = payload.readings[-1].battery_level
-            device.last_seen = datetime.utcnow()
-            device.is_active = True
+            db.query(db_models.ClassroomDevice).filter(
+                db_models.ClassroomDevice.id == device_id
+            ).update({
+                db_models.ClassroomDevice.battery_level: payload.readings[-1].battery_level,
+                db_models.ClassroomDevice.last_seen: datetime.utcnow(),
+                db_models.ClassroomDevice.is_active: True
+            }, synchronize_session=False)
         
         db.commit()
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message=f"Successfully recorded {recorded_count} BLE readings",
-                data={
+        return ORJSONResponse(
+            content={
+                **_BLE_BATCH_OK,
+                "message": f"Successfully recorded {recorded_count} BLE readings",
+                "data": {
                     "recorded_count": recorded_count,
                     "total_readings": len(payload.readings),
-                    "device_id": device.id
+                    "device_id": device_id
                 }
-            ).dict(),
+            },
             status_code=status.HTTP_201_CREATED,
         )
     except Exception as e:
         db.rollback()
         print(f"BLE batch recording error: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to record BLE batch: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to record BLE batch: {str(e)}", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR, cache=False)
+
+def _check_device_data_access(db: Session, device_id: str, user_id: str):
+    """
+    Error response if the user may not read the classroom device's data, else None. Device,
+    classroom owner and the caller's membership come back in one round trip.
+    """
+    access = db.execute(
+        select(
+            db_models.Class.owner_id,
+            exists().where(
+                db_models.ClassMember.class_id == db_models.ClassroomDevice.classroom_id,
+                db_models.ClassMember.user_id == user_id
+            )
         )
+        .select_from(db_models.ClassroomDevice)
+        .outerjoin(db_models.Class, db_models.Class.id == db_models.ClassroomDevice.classroom_id)
+        .where(db_models.ClassroomDevice.id == device_id)
+    ).first()
+    
+    if not access:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
+    
+    owner_id, is_member = access
+    
+    if not owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
+    
+    if not (owner_id == user_id or is_member):
+        return error_response(status.HTTP_403_FORBIDDEN, "Access denied to device data", error_type="unauthorized")
+    
+    return None
 
 # Get device data
 @router.get("/{device_id}/data", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_device_data(
+def get_device_data(
     device_id: str,
     start_time: Optional[datetime] = Query(None, description="Start time for data range"),
     end_time: Optional[datetime] = Query(None, description="End time for data range"),
@@ -669,55 +491,12 @@ async def get_device_data(
 ):
     """Get device sensor data with optional time filtering"""
     try:
-        # Get device
-        device = db.query(db_models.ClassroomDevice).filter(
-            db_models.ClassroomDevice.id == device_id
-        ).first()
-        
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
-        
-        # Check if user has access to this device
-        classroom = db.query(db_models.Class).filter(
-            db_models.Class.id == device.classroom_id
-        ).first()
-        
-        if not classroom:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Classroom not found",
-                    error_type="classroom_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
-        
-        # Check access permissions
-        is_teacher = classroom.owner_id == current_user.user_id
-        is_student = db.query(db_models.ClassMember).filter(
-            db_models.ClassMember.class_id == device.classroom_id,
-            db_models.ClassMember.user_id == current_user.user_id
-        ).first() is not None
-        
-        if not (is_teacher or is_student):
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied to device data",
-                    error_type="unauthorized"
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+        error = _check_device_data_access(db, device_id, current_user.user_id)
+        if error:
+            return error
         
         # Build query
-        query = db.query(db_models.ClassroomDeviceData).filter(
+        query = db.query(*_READING_COLUMNS).filter(
             db_models.ClassroomDeviceData.device_id == device_id
         )
         
@@ -727,53 +506,44 @@ async def get_device_data(
         if end_time:
             query = query.filter(db_models.ClassroomDeviceData.timestamp <= end_time)
         
-        # Get data ordered by timestamp (newest first)
-        data_records = query.order_by(desc(db_models.ClassroomDeviceData.timestamp)).limit(limit).all()
+        # Get data ordered by timestamp (newest first), fetched from the cursor in chunks
+        # while the response list is built instead of materialized as a row list first
+        data_records = query.order_by(desc(db_models.ClassroomDeviceData.timestamp)).limit(limit).yield_per(200)
         
-        # Format response data
+        # Format response data; datetimes are left to orjson, which formats them natively
         data_list = []
         for record in data_records:
             data_list.append({
                 "id": record.id,
                 "device_id": record.device_id,
-                "timestamp": record.timestamp.isoformat(),
-                "temperature": float(record.temperature) if record.temperature else None,
-                "thermometer": float(record.thermometer) if record.thermometer else None,
-                "humidity": float(record.humidity) if record.humidity else None,
-                "moisture": float(record.moisture) if record.moisture else None,
-                "light": float(record.light) if record.light else None,
-                "sound": float(record.sound) if record.sound else None,
+                "timestamp": record.timestamp,
+                "temperature": record.temperature,
+                "thermometer": record.thermometer,
+                "humidity": record.humidity,
+                "moisture": record.moisture,
+                "light": record.light,
+                "sound": record.sound,
                 "battery_level": record.battery_level,
-                "created_at": record.created_at.isoformat()
+                "created_at": record.created_at
             })
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "total_records": len(data_list),
-                    "data": data_list
-                }
-            ).dict(),
+        return success_response(
+            message="Device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "total_records": len(data_list),
+                "data": data_list
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception as e:
         print(f"Error retrieving device data: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get latest device data
 @router.get("/{device_id}/data/latest", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_latest_device_data(
+def get_latest_device_data(
     device_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -786,30 +556,20 @@ async def get_latest_device_data(
         ).first()
         
         if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
         
         # Get latest data record
-        latest_data = db.query(db_models.ClassroomDeviceData).filter(
+        latest_data = db.query(*_READING_COLUMNS).filter(
             db_models.ClassroomDeviceData.device_id == device_id
         ).order_by(desc(db_models.ClassroomDeviceData.timestamp)).first()
         
         if not latest_data:
-            return JSONResponse(
-                content=api_resp(
-                    success=True,
-                    message="No data available for this device",
-                    data={
-                        "device_id": device_id,
-                        "data": None
-                    }
-                ).dict(),
+            return success_response(
+                message="No data available for this device",
+                data={
+                    "device_id": device_id,
+                    "data": None
+                },
                 status_code=status.HTTP_200_OK,
             )
         
@@ -817,43 +577,33 @@ async def get_latest_device_data(
         data_response = {
             "id": latest_data.id,
             "device_id": latest_data.device_id,
-            "timestamp": latest_data.timestamp.isoformat(),
-            "temperature": float(latest_data.temperature) if latest_data.temperature else None,
-            "thermometer": float(latest_data.thermometer) if latest_data.thermometer else None,
-            "humidity": float(latest_data.humidity) if latest_data.humidity else None,
-            "moisture": float(latest_data.moisture) if latest_data.moisture else None,
-            "light": float(latest_data.light) if latest_data.light else None,
-            "sound": float(latest_data.sound) if latest_data.sound else None,
+            "timestamp": latest_data.timestamp,
+            "temperature": latest_data.temperature,
+            "thermometer": latest_data.thermometer,
+            "humidity": latest_data.humidity,
+            "moisture": latest_data.moisture,
+            "light": latest_data.light,
+            "sound": latest_data.sound,
             "battery_level": latest_data.battery_level,
-            "created_at": latest_data.created_at.isoformat()
+            "created_at": latest_data.created_at
         }
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Latest device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "data": data_response
-                }
-            ).dict(),
+        return success_response(
+            message="Latest device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "data": data_response
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception as e:
         print(f"Error retrieving latest device data: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve latest device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve latest device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get device information for anonymous students
 @router.get("/{device_id}/anonymous", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_device_anonymous(
+def get_device_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -863,62 +613,31 @@ async def get_device_anonymous(
     """Get device information for anonymous students"""
     try:
         # Verify anonymous student
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
-        
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error_type="authentication_error"
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
-        
-        # Get device
-        device = db.query(db_models.ClassroomDevice).filter(
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
+        
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_type="authentication_error")
+        
+        # Get device together with its assignment in one query
+        device, assignment = db.query(
+            db_models.ClassroomDevice, db_models.ClassroomDeviceAssignment
+        ).outerjoin(
+            db_models.ClassroomDeviceAssignment,
+            db_models.ClassroomDeviceAssignment.device_id == db_models.ClassroomDevice.id
+        ).filter(
             db_models.ClassroomDevice.id == device_id
-        ).first()
+        ).first() or (None, None)
         
         if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
         
         # Check if device is in the same classroom
         if device.classroom_id != class_id:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found in this classroom",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found in this classroom", error_type="device_not_found")
         
         # Check if device is public (anonymous students can only see public devices)
-        assignment = db.query(db_models.ClassroomDeviceAssignment).filter(
-            db_models.ClassroomDeviceAssignment.device_id == device_id
-        ).first()
-        
         if not assignment or assignment.assignment_type != "public":
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied - Device is not public",
-                    error_type="access_denied"
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied - Device is not public", error_type="access_denied")
         
         # Format response
         device_data = {
@@ -927,37 +646,27 @@ async def get_device_anonymous(
             "device_type": device.device_type,
             "is_active": device.is_active,
             "battery_level": device.battery_level,
-            "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+            "last_seen": device.last_seen,
             "assignment": {
                 "type": assignment.assignment_type if assignment else "public",
                 "id": assignment.assignment_id if assignment else None
             },
-            "created_at": device.created_at.isoformat()
+            "created_at": device.created_at
         }
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device information retrieved successfully",
-                data=device_data
-            ).dict(),
+        return success_response(
+            message="Device information retrieved successfully",
+            data=device_data,
             status_code=status.HTTP_200_OK,
         )
         
     except Exception as e:
         print(f"Error retrieving device information for anonymous student: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device information",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device information", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get device data for anonymous students
 @router.get("/{device_id}/data/anonymous", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_device_data_anonymous(
+def get_device_data_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -970,65 +679,34 @@ async def get_device_data_anonymous(
     """Get device sensor data for anonymous students"""
     try:
         # Verify anonymous student
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
-        
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error_type="authentication_error"
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
-        
-        # Get device
-        device = db.query(db_models.ClassroomDevice).filter(
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
+        
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_type="authentication_error")
+        
+        # Get device together with its assignment in one query
+        device, assignment = db.query(
+            db_models.ClassroomDevice, db_models.ClassroomDeviceAssignment
+        ).outerjoin(
+            db_models.ClassroomDeviceAssignment,
+            db_models.ClassroomDeviceAssignment.device_id == db_models.ClassroomDevice.id
+        ).filter(
             db_models.ClassroomDevice.id == device_id
-        ).first()
+        ).first() or (None, None)
         
         if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
         
         # Check if device is in the same classroom
         if device.classroom_id != class_id:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found in this classroom",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found in this classroom", error_type="device_not_found")
         
         # Check if device is public (anonymous students can only see public devices)
-        assignment = db.query(db_models.ClassroomDeviceAssignment).filter(
-            db_models.ClassroomDeviceAssignment.device_id == device_id
-        ).first()
-        
         if not assignment or assignment.assignment_type != "public":
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied - Device is not public",
-                    error_type="access_denied"
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied - Device is not public", error_type="access_denied")
         
         # Build query
-        query = db.query(db_models.ClassroomDeviceData).filter(
+        query = db.query(*_READING_COLUMNS).filter(
             db_models.ClassroomDeviceData.device_id == device_id
         )
         
@@ -1038,53 +716,44 @@ async def get_device_data_anonymous(
         if end_time:
             query = query.filter(db_models.ClassroomDeviceData.timestamp <= end_time)
         
-        # Get data ordered by timestamp (newest first)
-        data_records = query.order_by(desc(db_models.ClassroomDeviceData.timestamp)).limit(limit).all()
+        # Get data ordered by timestamp (newest first), fetched from the cursor in chunks
+        # while the response list is built instead of materialized as a row list first
+        data_records = query.order_by(desc(db_models.ClassroomDeviceData.timestamp)).limit(limit).yield_per(200)
         
-        # Format response data
+        # Format response data; datetimes are left to orjson, which formats them natively
         data_list = []
         for record in data_records:
             data_list.append({
                 "id": record.id,
                 "device_id": record.device_id,
-                "timestamp": record.timestamp.isoformat(),
-                "temperature": float(record.temperature) if record.temperature else None,
-                "thermometer": float(record.thermometer) if record.thermometer else None,
-                "humidity": float(record.humidity) if record.humidity else None,
-                "moisture": float(record.moisture) if record.moisture else None,
-                "light": float(record.light) if record.light else None,
-                "sound": float(record.sound) if record.sound else None,
+                "timestamp": record.timestamp,
+                "temperature": record.temperature,
+                "thermometer": record.thermometer,
+                "humidity": record.humidity,
+                "moisture": record.moisture,
+                "light": record.light,
+                "sound": record.sound,
                 "battery_level": record.battery_level,
-                "created_at": record.created_at.isoformat()
+                "created_at": record.created_at
             })
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "total_records": len(data_list),
-                    "data": data_list
-                }
-            ).dict(),
+        return success_response(
+            message="Device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "total_records": len(data_list),
+                "data": data_list
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception as e:
         print(f"Error retrieving device data for anonymous student: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get latest device data for anonymous students
 @router.get("/{device_id}/data/latest/anonymous", tags=["classroom-device"], status_code=status.HTTP_200_OK)
-async def get_latest_device_data_anonymous(
+def get_latest_device_data_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -1097,65 +766,34 @@ async def get_latest_device_data_anonymous(
     """Get the most recent sensor data for a device (anonymous students)"""
     try:
         # Verify anonymous student
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
-        
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error_type="authentication_error"
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
-        
-        # Get device
-        device = db.query(db_models.ClassroomDevice).filter(
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
+        
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_type="authentication_error")
+        
+        # Get device together with its assignment in one query
+        device, assignment = db.query(
+            db_models.ClassroomDevice, db_models.ClassroomDeviceAssignment
+        ).outerjoin(
+            db_models.ClassroomDeviceAssignment,
+            db_models.ClassroomDeviceAssignment.device_id == db_models.ClassroomDevice.id
+        ).filter(
             db_models.ClassroomDevice.id == device_id
-        ).first()
+        ).first() or (None, None)
         
         if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
         
         # Check if device is in the same classroom
         if device.classroom_id != class_id:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found in this classroom",
-                    error_type="device_not_found"
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found in this classroom", error_type="device_not_found")
         
         # Check if device is public (anonymous students can only see public devices)
-        assignment = db.query(db_models.ClassroomDeviceAssignment).filter(
-            db_models.ClassroomDeviceAssignment.device_id == device_id
-        ).first()
-        
         if not assignment or assignment.assignment_type != "public":
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied - Device is not public",
-                    error_type="access_denied"
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied - Device is not public", error_type="access_denied")
         
         # Build query for latest data
-        query = db.query(db_models.ClassroomDeviceData).filter(
+        query = db.query(*_READING_COLUMNS).filter(
             db_models.ClassroomDeviceData.device_id == device_id
         )
         
@@ -1169,15 +807,12 @@ async def get_latest_device_data_anonymous(
         latest_data = query.order_by(desc(db_models.ClassroomDeviceData.timestamp)).first()
         
         if not latest_data:
-            return JSONResponse(
-                content=api_resp(
-                    success=True,
-                    message="No data available for this device",
-                    data={
-                        "device_id": device_id,
-                        "data": None
-                    }
-                ).dict(),
+            return success_response(
+                message="No data available for this device",
+                data={
+                    "device_id": device_id,
+                    "data": None
+                },
                 status_code=status.HTTP_200_OK,
             )
         
@@ -1185,36 +820,26 @@ async def get_latest_device_data_anonymous(
         data_response = {
             "id": latest_data.id,
             "device_id": latest_data.device_id,
-            "timestamp": latest_data.timestamp.isoformat(),
-            "temperature": float(latest_data.temperature) if latest_data.temperature else None,
-            "thermometer": float(latest_data.thermometer) if latest_data.thermometer else None,
-            "humidity": float(latest_data.humidity) if latest_data.humidity else None,
-            "moisture": float(latest_data.moisture) if latest_data.moisture else None,
-            "light": float(latest_data.light) if latest_data.light else None,
-            "sound": float(latest_data.sound) if latest_data.sound else None,
+            "timestamp": latest_data.timestamp,
+            "temperature": latest_data.temperature,
+            "thermometer": latest_data.thermometer,
+            "humidity": latest_data.humidity,
+            "moisture": latest_data.moisture,
+            "light": latest_data.light,
+            "sound": latest_data.sound,
             "battery_level": latest_data.battery_level,
-            "created_at": latest_data.created_at.isoformat()
+            "created_at": latest_data.created_at
         }
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Latest device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "data": data_response
-                }
-            ).dict(),
+        return success_response(
+            message="Latest device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "data": data_response
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception as e:
         print(f"Error retrieving latest device data for anonymous student: {str(e)}")
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve latest device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve latest device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
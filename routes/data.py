@@ -1,21 +1,28 @@
 from fastapi import APIRouter, Depends, status, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
+from sqlalchemy import select, insert, update, bindparam
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-import uuid
 from datetime import datetime, timedelta
+import orjson
 
 from db.init_engine import get_db
 from db import db_models
 from utils import (
-    api_resp, error_resp, 
-    validate_mac_address, validate_time_range
+    uuid7, error_response, success_response, json_body, json_body_docs, naive_utc, reading_columns,
+    validate_mac_address, normalize_mac_address, validate_time_range
 )
-from middleware import get_current_user
+from cache import devices_by_mac, devices_by_id, latest_readings
 
 router = APIRouter(prefix="/device")
 
+# Device id lookup run by every upload; built once and reused across requests
+_DEVICE_ID_BY_MAC = select(db_models.Device.id).where(db_models.Device.mac_address == bindparam("mac_address"))
+
+# Reading columns with sensor values coerced to Float, shared with the other reading endpoints
+_DEVICE_DATA_COLUMNS = reading_columns(db_models.DeviceData)
+
 # Pydantic models for request/response
 class DeviceDataUpload(BaseModel):
     temperature: Optional[float] = Field(None, ge=-50, le=100)
@@ -26,41 +33,38 @@ class DeviceDataUpload(BaseModel):
     sound: Optional[float] = Field(None, ge=0, le=200)
     battery_level: Optional[int] = Field(None, ge=0, le=100)
 
-# Get device data
-@router.get("/{device_id}/data", tags=["data"], status_code=status.HTTP_200_OK)
-async def get_device_data(
-    device_id: str,
+class BufferedReading(DeviceDataUpload):
+    # When the reading was taken; buffered readings default to the upload time
+    timestamp: Optional[datetime] = None
+
+    _naive_timestamp = field_validator("timestamp")(naive_utc)
+
+class DeviceDataUploadBatch(BaseModel):
+    # One page of the engine's multi-row INSERT (insertmanyvalues_page_size)
+    readings: List[BufferedReading] = Field(..., min_length=1, max_length=1000)
+
+# Get device data by MAC address (direct access)
+@router.get("/mac/{mac_address}/data", tags=["data"], status_code=status.HTTP_200_OK)
+def get_device_data_by_mac(
+    mac_address: str,
     time_range: str = Query(default="24h", description="Time range: 1h, 6h, 24h, 7d, 30d"),
-    current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # Validate MAC address format
+    is_valid_mac, mac_error = validate_mac_address(mac_address)
+    if not is_valid_mac:
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
+    
     # Validate time range
     is_valid_range, range_error = validate_time_range(time_range)
     if not is_valid_range:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=range_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, range_error, error_type="validation_error")
     
-    # Check if device exists and belongs to user
-    device = db.query(db_models.Device).filter(
-        db_models.Device.id == device_id,
-        db_models.Device.user_id == current_user.user_id
-    ).first()
+    # Find device by MAC address
+    device_id = db.execute(_DEVICE_ID_BY_MAC, {"mac_address": normalize_mac_address(mac_address)}).scalar()
     
-    if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    if not device_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
     # Calculate time range
     now = datetime.utcnow()
@@ -77,244 +81,188 @@ async def get_device_data(
     else:
         start_time = now - timedelta(hours=24)  # Default to 24h
     
-    # Get sensor data within time range
-    sensor_data = db.query(db_models.DeviceData).filter(
-        db_models.DeviceData.device_id == device_id,
-        db_models.DeviceData.timestamp >= start_time
-    ).order_by(db_models.DeviceData.timestamp.desc()).all()
-    
-    # Format sensor data
-    sensor_data_list = []
-    for data in sensor_data:
-        sensor_data_list.append({
-            "timestamp": data.timestamp.isoformat() if data.timestamp else None,
-            "temperature": float(data.temperature) if data.temperature is not None else None,
-            "thermometer": float(data.thermometer) if data.thermometer is not None else None,
-            "humidity": float(data.humidity) if data.humidity is not None else None,
-            "moisture": float(data.moisture) if data.moisture is not None else None,
-            "light": float(data.light) if data.light is not None else None,
-            "sound": float(data.sound) if data.sound is not None else None
-        })
-    
-    # Get current readings (most recent data)
-    current_readings = None
-    if sensor_data:
-        latest_data = sensor_data[0]  # Most recent due to desc order
-        current_readings = {
-            "temperature": float(latest_data.temperature) if latest_data.temperature is not None else None,
-            "thermometer": float(latest_data.thermometer) if latest_data.thermometer is not None else None,
-            "humidity": float(latest_data.humidity) if latest_data.humidity is not None else None,
-            "moisture": float(latest_data.moisture) if latest_data.moisture is not None else None,
-            "light": float(latest_data.light) if latest_data.light is not None else None,
-            "sound": float(latest_data.sound) if latest_data.sound is not None else None,
-            "timestamp": latest_data.timestamp.isoformat() if latest_data.timestamp else None
-        }
+    # Get sensor data within time range, streamed from the cursor in chunks
+    # (a 30d range can hold tens of thousands of readings)
+    rows = db.execute(
+        select(*_DEVICE_DATA_COLUMNS).where(
+            db_models.DeviceData.device_id == device_id,
+            db_models.DeviceData.timestamp >= start_time
+        ).order_by(db_models.DeviceData.timestamp.desc()).execution_options(yield_per=500)
+    )
     
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="Device data retrieved successfully",
-            data={
-                "device_id": device_id,
-                "time_range": time_range,
-                "sensor_data": sensor_data_list,
-                "current_readings": current_readings
+    def stream_body():
+        # Same envelope as api_resp(...).model_dump(), written incrementally so neither the
+        # rows nor the encoded body are held in memory all at once
+        yield (
+            b'{"success":true,"message":"Device data retrieved successfully","data":{"device_id":'
+            + orjson.dumps(device_id)
+            + b',"time_range":'
+            + orjson.dumps(time_range)
+            + b',"sensor_data":['
+        )
+        current_readings = None
+        for data in rows:
+            reading = {
+                "timestamp": data.timestamp,
+                "temperature": data.temperature,
+                "thermometer": data.thermometer,
+                "humidity": data.humidity,
+                "moisture": data.moisture,
+                "light": data.light,
+                "sound": data.sound
             }
-        ).dict(),
-        status_code=status.HTTP_200_OK,
-    )
+            if current_readings is None:
+                # Most recent reading due to desc order
+                current_readings = reading
+                yield orjson.dumps(reading)
+            else:
+                yield b',' + orjson.dumps(reading)
+        yield (
+            b'],"current_readings":'
+            + orjson.dumps(current_readings)
+            + b'},"error":null,"error_type":null}'
+        )
+    
+    return StreamingResponse(stream_body(), media_type="application/json", status_code=status.HTTP_200_OK)
 
-# Get device data by MAC address (direct access)
-@router.get("/mac/{mac_address}/data", tags=["data"], status_code=status.HTTP_200_OK)
-async def get_device_data_by_mac(
+# Upload device data (for P-Bit devices); buffered readings go to /upload-batch in one request
+@router.post("/mac/{mac_address}/upload", tags=["data"], status_code=status.HTTP_200_OK)
+def upload_device_data(
     mac_address: str,
-    time_range: str = Query(default="24h", description="Time range: 1h, 6h, 24h, 7d, 30d"),
+    payload: DeviceDataUpload,
     db: Session = Depends(get_db)
 ):
     # Validate MAC address format
     is_valid_mac, mac_error = validate_mac_address(mac_address)
     if not is_valid_mac:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=mac_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
     
-    # Validate time range
-    is_valid_range, range_error = validate_time_range(time_range)
-    if not is_valid_range:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=range_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+    mac_address = normalize_mac_address(mac_address)
     
-    # Find device by MAC address
-    device = db.query(db_models.Device).filter(
-        db_models.Device.mac_address == mac_address
-    ).first()
+    # Find device by MAC address (only the id is needed)
+    device_id = db.execute(_DEVICE_ID_BY_MAC, {"mac_address": mac_address}).scalar()
     
-    if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    if not device_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
-    # Calculate time range
     now = datetime.utcnow()
-    if time_range == "1h":
-        start_time = now - timedelta(hours=1)
-    elif time_range == "6h":
-        start_time = now - timedelta(hours=6)
-    elif time_range == "24h":
-        start_time = now - timedelta(hours=24)
-    elif time_range == "7d":
-        start_time = now - timedelta(days=7)
-    elif time_range == "30d":
-        start_time = now - timedelta(days=30)
-    else:
-        start_time = now - timedelta(hours=24)  # Default to 24h
     
-    # Get sensor data within time range
-    sensor_data = db.query(db_models.DeviceData).filter(
-        db_models.DeviceData.device_id == device.id,
-        db_models.DeviceData.timestamp >= start_time
-    ).order_by(db_models.DeviceData.timestamp.desc()).all()
+    # Device status update, applied in the same transaction as the reading
+    device_status = {"is_active": True, "last_seen": now}
+    if payload.battery_level is not None:
+        device_status["battery_level"] = payload.battery_level
     
-    # Format sensor data
-    sensor_data_list = []
-    for data in sensor_data:
-        sensor_data_list.append({
-            "timestamp": data.timestamp.isoformat() if data.timestamp else None,
-            "temperature": float(data.temperature) if data.temperature is not None else None,
-            "thermometer": float(data.thermometer) if data.thermometer is not None else None,
-            "humidity": float(data.humidity) if data.humidity is not None else None,
-            "moisture": float(data.moisture) if data.moisture is not None else None,
-            "light": float(data.light) if data.light is not None else None,
-            "sound": float(data.sound) if data.sound is not None else None
+    try:
+        # Plain INSERT/UPDATE statements: no ORM instances, identity map or refresh for a write-only path
+        db.execute(insert(db_models.DeviceData), {
+            "id": uuid7(),
+            "device_id": device_id,
+            "timestamp": now,
+            "temperature": payload.temperature,
+            "thermometer": payload.thermometer,
+            "humidity": payload.humidity,
+            "moisture": payload.moisture,
+            "light": payload.light,
+            "sound": payload.sound
         })
-    
-    # Get current readings (most recent data)
-    current_readings = None
-    if sensor_data:
-        latest_data = sensor_data[0]  # Most recent due to desc order
-        current_readings = {
-            "temperature": float(latest_data.temperature) if latest_data.temperature is not None else None,
-            "thermometer": float(latest_data.thermometer) if latest_data.thermometer is not None else None,
-            "humidity": float(latest_data.humidity) if latest_data.humidity is not None else None,
-            "moisture": float(latest_data.moisture) if latest_data.moisture is not None else None,
-            "light": float(latest_data.light) if latest_data.light is not None else None,
-            "sound": float(latest_data.sound) if latest_data.sound is not None else None,
-            "timestamp": latest_data.timestamp.isoformat() if latest_data.timestamp else None
-        }
-    
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="Device data retrieved successfully",
+        db.execute(
+            update(db_models.Device).where(db_models.Device.id == device_id).values(**device_status)
+        )
+        db.commit()
+        # The cached device payloads carry is_active/battery_level/last_seen
+        devices_by_mac.delete(mac_address)
+        devices_by_id.delete(device_id)
+        latest_readings.delete(device_id)
+        
+        return success_response(
+            message="Data uploaded successfully",
             data={
-                "device_id": device.id,
-                "time_range": time_range,
-                "sensor_data": sensor_data_list,
-                "current_readings": current_readings
-            }
-        ).dict(),
-        status_code=status.HTTP_200_OK,
-    )
+                "device_id": device_id,
+                "timestamp": now,
+                "temperature": payload.temperature,
+                "thermometer": payload.thermometer,
+                "humidity": payload.humidity,
+                "moisture": payload.moisture,
+                "light": payload.light,
+                "sound": payload.sound
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except Exception:
+        db.rollback()
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to upload data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-# Upload device data (for P-Bit devices)
-@router.post("/mac/{mac_address}/upload", tags=["data"], status_code=status.HTTP_200_OK)
-async def upload_device_data(
+# Upload buffered readings in one request (for P-Bit devices flushing after being offline)
+@router.post("/mac/{mac_address}/upload-batch", tags=["data"], status_code=status.HTTP_200_OK, openapi_extra=json_body_docs(DeviceDataUploadBatch))
+def upload_device_data_batch(
     mac_address: str,
-    payload: DeviceDataUpload,
+    payload: DeviceDataUploadBatch = Depends(json_body(DeviceDataUploadBatch)),
     db: Session = Depends(get_db)
 ):
     # Validate MAC address format
     is_valid_mac, mac_error = validate_mac_address(mac_address)
     if not is_valid_mac:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=mac_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
     
-    # Find device by MAC address
-    device = db.query(db_models.Device).filter(
-        db_models.Device.mac_address == mac_address
-    ).first()
+    mac_address = normalize_mac_address(mac_address)
     
-    if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    # One device lookup for the whole batch
+    device_id = db.execute(_DEVICE_ID_BY_MAC, {"mac_address": mac_address}).scalar()
     
-    # Create new data entry
-    new_data = db_models.DeviceData(
-        id=str(uuid.uuid4()),
-        device_id=device.id,
-        timestamp=datetime.utcnow(),
-        temperature=payload.temperature,
-        thermometer=payload.thermometer,
-        humidity=payload.humidity,
-        moisture=payload.moisture,
-        light=payload.light,
-        sound=payload.sound
-    )
+    if not device_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
+    
+    now = datetime.utcnow()
+    # Buffered readings were taken before this upload; a later timestamp means a wrong device clock
+    if any(reading.timestamp is not None and reading.timestamp > now for reading in payload.readings):
+        return error_response(status.HTTP_400_BAD_REQUEST, "Reading timestamps cannot be in the future", error_type="validation_error")
+    
+    rows = [
+        {
+            "id": uuid7(),
+            "device_id": device_id,
+            "timestamp": reading.timestamp or now,
+            "temperature": reading.temperature,
+            "thermometer": reading.thermometer,
+            "humidity": reading.humidity,
+            "moisture": reading.moisture,
+            "light": reading.light,
+            "sound": reading.sound
+        }
+        for reading in payload.readings
+    ]
+    
+    # The device is talking to us now, however old its buffered readings are; its battery
+    # level follows the newest reading that reported one
+    device_status = {"is_active": True, "last_seen": now}
+    battery_readings = [
+        (row["timestamp"], reading.battery_level)
+        for row, reading in zip(rows, payload.readings)
+        if reading.battery_level is not None
+    ]
+    if battery_readings:
+        device_status["battery_level"] = max(battery_readings, key=lambda item: item[0])[1]
     
     try:
-        db.add(new_data)
-        
-        # Update device status
-        device.is_active = True
-        device.last_seen = datetime.utcnow()
-        if payload.battery_level is not None:
-            device.battery_level = payload.battery_level
-        
+        # A list of parameter sets is sent as batched multi-row INSERTs, with a single commit
+        db.execute(insert(db_models.DeviceData), rows)
+        db.execute(
+            update(db_models.Device).where(db_models.Device.id == device_id).values(**device_status)
+        )
         db.commit()
-        db.refresh(new_data)
+        devices_by_mac.delete(mac_address)
+        devices_by_id.delete(device_id)
+        latest_readings.delete(device_id)
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Data uploaded successfully",
-                data={
-                    "device_id": device.id,
-                    "timestamp": new_data.timestamp.isoformat() if new_data.timestamp else None,
-                    "temperature": float(new_data.temperature) if new_data.temperature is not None else None,
-                    "thermometer": float(new_data.thermometer) if new_data.thermometer is not None else None,
-                    "humidity": float(new_data.humidity) if new_data.humidity is not None else None,
-                    "moisture": float(new_data.moisture) if new_data.moisture is not None else None,
-                    "light": float(new_data.light) if new_data.light is not None else None,
-                    "sound": float(new_data.sound) if new_data.sound is not None else None
-                }
-            ).dict(),
+        return success_response(
+            message=f"Uploaded {len(rows)} readings",
+            data={
+                "device_id": device_id,
+                "recorded_count": len(rows),
+                "last_seen": device_status["last_seen"]
+            },
             status_code=status.HTTP_200_OK,
         )
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to upload data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to upload data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,33 +1,129 @@
+import logging
 from fastapi import APIRouter, Depends, status, Query, Request
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc, and_, or_, select, insert, update, delete, exists, bindparam
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
-import uuid
+import os
 from datetime import datetime, timedelta
+import orjson
 
 from db.init_engine import get_db
 from db import db_models
 from utils import (
-    api_resp, error_resp, 
-    validate_mac_address, validate_nickname, validate_assignment_type
+    uuid7, error_response, success_response, ORJSONResponse, strict_load, unique_violation, naive_utc, reading_columns, json_body, json_body_docs,
+    validate_mac_address, normalize_mac_address, validate_nickname, validate_assignment_type
 )
-from middleware import get_current_user
+from middleware import get_current_user, get_anonymous_student_id, get_classroom_owner_id
+from cache import devices_by_mac, devices_by_id, latest_readings
 
-router = APIRouter(prefix="/device")
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/device", default_response_class=ORJSONResponse)
+
+# Sensor readings are only serialized, never modified: select plain column rows
+# instead of hydrating an ORM instance per reading
+_DEVICE_DATA_COLUMNS = reading_columns(db_models.DeviceData)
+
+def _is_bookmarked(device_id: str, user_id: str):
+    """
+    EXISTS predicate for "the user has bookmarked this device", the ownership check
+    behind the device management endpoints. Returned as a clause so callers can fold it
+    into their own statement instead of paying a separate round trip.
+    """
+    return exists().where(
+        db_models.DeviceBookmark.device_id == device_id,
+        db_models.DeviceBookmark.user_id == user_id
+    )
+
+def _device_access(db: Session, device_id: str, user_id: str):
+    """
+    (device exists, user may read its data) in a single query. Access comes from a
+    bookmark or from an assignment to a classroom the user is a member of. Not cached, so
+    an unassignment, unbookmark or membership removal takes effect in every worker at once.
+    """
+    device_exists, has_access = db.execute(select(
+        exists().where(db_models.Device.id == device_id),
+        or_(
+            _is_bookmarked(device_id, user_id),
+            exists().where(
+                db_models.DeviceAssignment.classroom_id == db_models.ClassMember.class_id,
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.ClassMember.user_id == user_id
+            )
+        )
+    )).one()
+    return device_exists, has_access
+
+def _device_payload(db: Session, device_id: str) -> Optional[dict]:
+    """Device details as returned by the device endpoints, or None if it doesn't exist. Cached across requests."""
+    device_data = devices_by_id.get(device_id)
+    if device_data is None:
+        device = db.query(db_models.Device).options(*strict_load()).filter(
+            db_models.Device.id == device_id
+        ).first()
+        if not device:
+            return None
+        device_data = {
+            "id": device.id,
+            "mac_address": device.mac_address,
+            "nickname": None,
+            "is_active": device.is_active,
+            "battery_level": device.battery_level,
+            "last_seen": device.last_seen,
+            "created_at": device.created_at,
+            "updated_at": device.updated_at
+        }
+        devices_by_id.set(device_id, device_data)
+    return device_data
+
+def _latest_reading(db: Session, device_id: str) -> Optional[dict]:
+    """Newest reading of a device as served by the latest-data endpoints, or None if it has none. Cached across requests."""
+    reading = latest_readings.get(device_id)
+    if reading is None:
+        latest_data = db.query(*_DEVICE_DATA_COLUMNS).filter(
+            db_models.DeviceData.device_id == device_id
+        ).order_by(desc(db_models.DeviceData.timestamp)).first()
+        if not latest_data:
+            return None
+        reading = {
+            "id": latest_data.id,
+            "device_id": latest_data.device_id,
+            "timestamp": latest_data.timestamp,
+            "temperature": latest_data.temperature,
+            "thermometer": latest_data.thermometer,
+            "humidity": latest_data.humidity,
+            "moisture": latest_data.moisture,
+            "light": latest_data.light,
+            "sound": latest_data.sound,
+            "created_at": latest_data.created_at
+        }
+        latest_readings.set(device_id, reading)
+    return reading
 
 # Pydantic models for request/response
 class DeviceRegister(BaseModel):
+    # Strip surrounding whitespace at parse time; request payloads are never mutated
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     mac_address: str = Field(..., min_length=17, max_length=17)
     nickname: str = Field(..., min_length=2, max_length=20)
 
+class DeviceRegisterBulk(BaseModel):
+    devices: List[DeviceRegister] = Field(..., min_length=1, max_length=100)
+
 class DeviceAssign(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     classroom_id: str = Field(..., min_length=1)
     assignment_type: str = Field(..., min_length=1)
     assignment_id: Optional[str] = Field(None)
 
 class BLEDeviceRegister(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     nickname: str = Field(..., min_length=2, max_length=50)
     mac_address: Optional[str] = Field("", max_length=17)
     is_active: bool = Field(True)
@@ -35,6 +131,19 @@ class BLEDeviceRegister(BaseModel):
     device_type: str = Field("ble", max_length=10)
     description: Optional[str] = Field(None, max_length=200)
 
+def _ble_mac_address(mac_address: Optional[str]) -> tuple[Optional[str], str]:
+    """
+    MAC address to store for a BLE registration, as (mac_address, error_message): a supplied
+    address is validated and normalized like every lookup path expects, a missing one gets a
+    unique BLE:<8 hex digits> placeholder (mac_address is unique, so "" cannot be shared).
+    """
+    if not mac_address:
+        return f"BLE:{os.urandom(4).hex()}", ""
+    is_valid_mac, mac_error = validate_mac_address(mac_address)
+    if not is_valid_mac:
+        return None, mac_error
+    return normalize_mac_address(mac_address), ""
+
 class BLEDataReading(BaseModel):
     timestamp: datetime
     temperature: Optional[float] = Field(None, ge=-50, le=100)
@@ -46,7 +155,7 @@ class BLEDataReading(BaseModel):
     battery_level: Optional[float] = Field(None, ge=0, le=100)
 
 class BLEBatchRecord(BaseModel):
-    readings: List[BLEDataReading] = Field(..., min_items=1, max_items=100)
+    readings: List[BLEDataReading] = Field(..., min_length=1, max_length=100)
 
 class DeviceDataInput(BaseModel):
     device_id: str = Field(..., min_length=1)
@@ -58,6 +167,11 @@ class DeviceDataInput(BaseModel):
     light: Optional[float] = Field(None, ge=0, le=100000)
     sound: Optional[float] = Field(None, ge=0, le=200)
 
+    _naive_timestamp = field_validator("timestamp")(naive_utc)
+
+class DeviceDataBatch(BaseModel):
+    readings: List[DeviceDataInput] = Field(..., min_length=1, max_length=100)
+
 class DeviceDataResponse(BaseModel):
     id: str
     device_id: str
@@ -73,7 +187,7 @@ class DeviceDataResponse(BaseModel):
 
 # Register new device (or bookmark existing device)
 @router.post("/register", tags=["device"], status_code=status.HTTP_201_CREATED)
-async def register_device(
+def register_device(
     payload: DeviceRegister,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -81,136 +195,259 @@ async def register_device(
     # Validate input
     is_valid_mac, mac_error = validate_mac_address(payload.mac_address)
     if not is_valid_mac:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=mac_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
     
     is_valid_nickname, nickname_error = validate_nickname(payload.nickname)
     if not is_valid_nickname:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=nickname_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, nickname_error, error_type="validation_error")
     
-    # Check if device with this MAC address already exists
-    existing_device = db.query(db_models.Device).filter(
-        db_models.Device.mac_address == payload.mac_address
-    ).first()
+    mac_address = normalize_mac_address(payload.mac_address)
     
-    # Check if user already has a bookmark for this device
-    existing_bookmark = None
-    if existing_device:
-        existing_bookmark = db.query(db_models.DeviceBookmark).filter(
-            db_models.DeviceBookmark.device_id == existing_device.id,
-            db_models.DeviceBookmark.user_id == current_user.user_id
-        ).first()
+    # One round trip for all pre-checks: the device with this MAC address (plus this
+    # user's bookmark of it) and whichever device this user already gave the nickname to
+    rows = db.execute(
+        select(
+            db_models.Device,
+            db_models.DeviceBookmark,
+            (db_models.DeviceBookmark.nickname == payload.nickname).label("nickname_taken")
+        ).outerjoin(
+            db_models.DeviceBookmark,
+            and_(
+                db_models.DeviceBookmark.device_id == db_models.Device.id,
+                db_models.DeviceBookmark.user_id == current_user.user_id
+            )
+        ).where(
+            or_(
+                db_models.Device.mac_address == mac_address,
+                db_models.Device.id.in_(
+                    select(db_models.DeviceBookmark.device_id).where(
+                        db_models.DeviceBookmark.user_id == current_user.user_id,
+                        db_models.DeviceBookmark.nickname == payload.nickname
+                    )
+                )
+            )
+        )
+    ).all()
     
-    # Check if nickname already exists for this user
-    existing_nickname = db.query(db_models.DeviceBookmark).filter(
-        db_models.DeviceBookmark.user_id == current_user.user_id,
-        db_models.DeviceBookmark.nickname == payload.nickname
-    ).first()
+    existing_device = None
+    existing_bookmark = None
+    existing_nickname = False
+    for device, bookmark, nickname_taken in rows:
+        if device.mac_address == mac_address:
+            existing_device = device
+            existing_bookmark = bookmark
+        if nickname_taken:
+            existing_nickname = True
     
     if existing_nickname:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Nickname already exists for this user",
-                error_type="duplicate_nickname"
-            ).dict(),
-            status_code=status.HTTP_409_CONFLICT,
-        )
+        return error_response(status.HTTP_409_CONFLICT, "Nickname already exists for this user", error_type="duplicate_nickname")
     
     # If user already has a bookmark for this device, return existing bookmark
     if existing_bookmark:
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device already bookmarked with this user",
-                data={
-                    "id": existing_device.id,
-                    "mac_address": existing_device.mac_address,
-                    "nickname": existing_bookmark.nickname,
-                    "is_active": existing_device.is_active,
-                    "battery_level": existing_device.battery_level,
-                    "last_seen": existing_device.last_seen.isoformat() if existing_device.last_seen else None,
-                    "created_at": existing_device.created_at.isoformat() if existing_device.created_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="Device already bookmarked with this user",
+            data={
+                "id": existing_device.id,
+                "mac_address": existing_device.mac_address,
+                "nickname": existing_bookmark.nickname,
+                "is_active": existing_device.is_active,
+                "battery_level": existing_device.battery_level,
+                "last_seen": existing_device.last_seen,
+                "created_at": existing_device.created_at
+            },
             status_code=status.HTTP_200_OK,
         )
     
     try:
         # If device doesn't exist, create it
         if not existing_device:
-            new_device = db_models.Device(
-                id=str(uuid.uuid4()),
-                mac_address=payload.mac_address,
-                is_active=False,
-                battery_level=0,
-                last_seen=None
-            )
-            db.add(new_device)
-            db.flush()  # Get the ID without committing
-            device_id = new_device.id
-        else:
-            device_id = existing_device.id
+            device = {
+                "id": uuid7(),
+                "mac_address": mac_address,
+                "is_active": False,
+                "battery_level": 0,
+                "last_seen": None,
+                "created_at": datetime.utcnow()
+            }
+            try:
+                db.execute(insert(db_models.Device).values(**device))
+            except IntegrityError as e:
+                # Only a concurrent registration of the same MAC address is recovered from: the
+                # insert is this transaction's first write, so after a rollback we bookmark that device
+                if not unique_violation(e, db_models.Device, "ux_devices_mac_address"):
+                    raise
+                db.rollback()
+                existing_device = db.query(db_models.Device).options(*strict_load()).filter(
+                    db_models.Device.mac_address == mac_address
+                ).one()
+        
+        # Same response shape whether the device was just created or already existed
+        if existing_device:
+            device = {
+                "id": existing_device.id,
+                "mac_address": existing_device.mac_address,
+                "is_active": existing_device.is_active,
+                "battery_level": existing_device.battery_level,
+                "last_seen": existing_device.last_seen,
+                "created_at": existing_device.created_at
+            }
         
         # Create bookmark for the user
         new_bookmark = db_models.DeviceBookmark(
-            id=str(uuid.uuid4()),
-            device_id=device_id,
+            id=uuid7(),
+            device_id=device["id"],
             user_id=current_user.user_id,
             nickname=payload.nickname
         )
         db.add(new_bookmark)
         db.commit()
         
-        # Get the device for response
-        device = db.query(db_models.Device).filter(db_models.Device.id == device_id).first()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device bookmarked successfully",
-                data={
-                    "id": device.id,
-                    "mac_address": device.mac_address,
-                    "nickname": new_bookmark.nickname,
-                    "is_active": device.is_active,
-                    "battery_level": device.battery_level,
-                    "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-                    "created_at": device.created_at.isoformat() if device.created_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="Device bookmarked successfully",
+            data={
+                "id": device["id"],
+                "mac_address": device["mac_address"],
+                "nickname": payload.nickname,
+                "is_active": device["is_active"],
+                "battery_level": device["battery_level"],
+                "last_seen": device["last_seen"],
+                "created_at": device["created_at"]
+            },
             status_code=status.HTTP_201_CREATED,
         )
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning("Device registration conflict: %s", e.orig)
+        # A concurrent request bookmarked the same device or nickname first;
+        # the unique constraints catch what the pre-check could not
+        if unique_violation(e, db_models.DeviceBookmark, "unique_user_device_bookmark", "unique_user_nickname"):
+            return error_response(status.HTTP_409_CONFLICT, "Device or nickname already registered", error_type="duplicate_device")
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to bookmark device: {str(e.orig)}", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR, cache=False)
     except Exception as e:
         db.rollback()
         print(f"Device registration error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to bookmark device: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to bookmark device: {str(e)}", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR, cache=False)
+
+# Register (bookmark) several devices in one request
+@router.post("/register-bulk", tags=["device"], status_code=status.HTTP_201_CREATED)
+def register_devices_bulk(
+    payload: DeviceRegisterBulk,
+    current_user: db_models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Bookmark up to 100 devices at once. Each item gets its own result using the same
+    rules as /device/register; all new rows are written in a single transaction.
+    """
+    results = []
+    pending = []  # (result index, normalized MAC address, nickname)
+    for item in payload.devices:
+        is_valid_mac, mac_error = validate_mac_address(item.mac_address)
+        if not is_valid_mac:
+            results.append({"mac_address": item.mac_address, "nickname": item.nickname, "success": False, "message": mac_error, "error_type": "validation_error"})
+            continue
+        
+        is_valid_nickname, nickname_error = validate_nickname(item.nickname)
+        if not is_valid_nickname:
+            results.append({"mac_address": item.mac_address, "nickname": item.nickname, "success": False, "message": nickname_error, "error_type": "validation_error"})
+            continue
+        
+        pending.append((len(results), normalize_mac_address(item.mac_address), item.nickname))
+        results.append(None)
+    
+    macs = {mac for _, mac, _ in pending}
+    nicknames = {nickname for _, _, nickname in pending}
+    
+    # Two lookups for the whole batch: the devices that already exist, and this user's
+    # bookmarks that either point at one of them or already use one of the nicknames
+    device_ids = {}  # MAC address -> device id
+    if macs:
+        device_ids = dict(
+            db.query(db_models.Device.mac_address, db_models.Device.id).filter(
+                db_models.Device.mac_address.in_(macs)
+            ).all()
         )
+    
+    bookmark_nicknames = {}  # device id -> this user's nickname for it
+    taken_nicknames = set()
+    if pending:
+        user_bookmarks = db.query(db_models.DeviceBookmark.device_id, db_models.DeviceBookmark.nickname).filter(
+            db_models.DeviceBookmark.user_id == current_user.user_id,
+            or_(
+                db_models.DeviceBookmark.device_id.in_(list(device_ids.values())),
+                db_models.DeviceBookmark.nickname.in_(nicknames)
+            )
+        ).all()
+        for device_id, nickname in user_bookmarks:
+            bookmark_nicknames[device_id] = nickname
+            taken_nicknames.add(nickname.lower())
+    
+    new_devices = []
+    new_bookmarks = []
+    for index, mac_address, nickname in pending:
+        result = {"mac_address": mac_address, "nickname": nickname}
+        device_id = device_ids.get(mac_address)
+        
+        if nickname.lower() in taken_nicknames:
+            result.update(success=False, message="Nickname already exists for this user", error_type="duplicate_nickname")
+        elif device_id in bookmark_nicknames:
+            result.update(success=True, message="Device already bookmarked with this user", id=device_id, nickname=bookmark_nicknames[device_id])
+        else:
+            if not device_id:
+                device_id = uuid7()
+                new_devices.append({
+                    "id": device_id,
+                    "mac_address": mac_address,
+                    "is_active": False,
+                    "battery_level": 0,
+                    "last_seen": None
+                })
+                # Later items with the same MAC address bookmark this device instead
+                device_ids[mac_address] = device_id
+            
+            new_bookmarks.append({
+                "id": uuid7(),
+                "device_id": device_id,
+                "user_id": current_user.user_id,
+                "nickname": nickname
+            })
+            bookmark_nicknames[device_id] = nickname
+            taken_nicknames.add(nickname.lower())
+            result.update(success=True, message="Device bookmarked successfully", id=device_id)
+        
+        results[index] = result
+    
+    try:
+        # One executemany INSERT per table for everything that is new
+        if new_devices:
+            db.execute(insert(db_models.Device), new_devices)
+        if new_bookmarks:
+            db.execute(insert(db_models.DeviceBookmark), new_bookmarks)
+        db.commit()
+    except IntegrityError as e:
+        # Another request registered one of these MAC addresses or nicknames concurrently
+        db.rollback()
+        logger.warning("Bulk device registration conflict: %s", e.orig)
+        return error_response(status.HTTP_409_CONFLICT, "One or more devices or nicknames were registered concurrently; retry the batch", error_type="duplicate_device")
+    except Exception:
+        db.rollback()
+        logger.exception("Bulk device registration failed")
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to bookmark devices", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return success_response(
+        message=f"{len(new_bookmarks)} devices bookmarked",
+        data={
+            "bookmarked_count": len(new_bookmarks),
+            "results": results
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
 
 # Register BLE device
 @router.post("/register-ble", tags=["device"], status_code=status.HTTP_201_CREATED)
-async def register_ble_device(
+def register_ble_device(
     payload: BLEDeviceRegister,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -218,34 +455,31 @@ async def register_ble_device(
     # Validate nickname
     is_valid_nickname, nickname_error = validate_nickname(payload.nickname)
     if not is_valid_nickname:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=nickname_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, nickname_error, error_type="validation_error")
+    
+    mac_address, mac_error = _ble_mac_address(payload.mac_address)
+    if mac_error:
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
     
     # Allow duplicate nicknames for BLE devices - they can be in multiple classrooms
     
     try:
         # Create BLE device
         new_device = db_models.Device(
-            id=str(uuid.uuid4()),
-            mac_address=payload.mac_address or f"BLE:{str(uuid.uuid4())[:8]}",  # Generate unique BLE identifier
+            id=uuid7(),
+            mac_address=mac_address,
             is_active=payload.is_active,
             battery_level=payload.battery_level or 0,
             last_seen=datetime.utcnow(),
             device_type=payload.device_type,
-            description=payload.description
+            description=payload.description,
+            created_at=datetime.utcnow()  # set here so the response needs no refresh
         )
         db.add(new_device)
-        db.flush()  # Get the ID without committing
         
         # Create bookmark for the user
         new_bookmark = db_models.DeviceBookmark(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             device_id=new_device.id,
             user_id=current_user.user_id,
             nickname=payload.nickname
@@ -253,70 +487,61 @@ async def register_ble_device(
         db.add(new_bookmark)
         db.commit()
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="BLE device registered successfully",
-                data={
-                    "device_id": new_device.id,
-                    "mac_address": new_device.mac_address,
-                    "nickname": new_bookmark.nickname,
-                    "is_active": new_device.is_active,
-                    "battery_level": new_device.battery_level,
-                    "device_type": new_device.device_type,
-                    "description": new_device.description,
-                    "last_seen": new_device.last_seen.isoformat() if new_device.last_seen else None,
-                    "created_at": new_device.created_at.isoformat() if new_device.created_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="BLE device registered successfully",
+            data={
+                "device_id": new_device.id,
+                "mac_address": new_device.mac_address,
+                "nickname": new_bookmark.nickname,
+                "is_active": new_device.is_active,
+                "battery_level": new_device.battery_level,
+                "device_type": new_device.device_type,
+                "description": new_device.description,
+                "last_seen": new_device.last_seen,
+                "created_at": new_device.created_at
+            },
             status_code=status.HTTP_201_CREATED,
         )
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, db_models.Device, "ux_devices_mac_address"):
+            return error_response(status.HTTP_409_CONFLICT, "A device with this MAC address is already registered", error_type="duplicate_device")
+        logger.error("BLE device registration failed: %s", e.orig)
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to register BLE device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception as e:
         db.rollback()
         print(f"BLE device registration error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=f"Failed to register BLE device: {str(e)}",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to register BLE device: {str(e)}", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR, cache=False)
 
 
 # Get user's bookmarked devices
 @router.get("/user-devices", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_user_devices(
+def get_user_devices(
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Get all device bookmarks for the current user
-    bookmarks = db.query(db_models.DeviceBookmark).filter(
+    # Load bookmarks with their device, assignments and classrooms up front
+    # (one round trip per level instead of one per bookmark and assignment)
+    bookmarks = db.query(db_models.DeviceBookmark).options(*strict_load(
+        joinedload(db_models.DeviceBookmark.device)
+        .selectinload(db_models.Device.assignments)
+        .joinedload(db_models.DeviceAssignment.classroom)
+    )).filter(
         db_models.DeviceBookmark.user_id == current_user.user_id
     ).all()
     
     devices_data = []
     for bookmark in bookmarks:
-        # Get the device
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == bookmark.device_id
-        ).first()
+        device = bookmark.device
         
         if not device:
             continue
-            
-        # Get classroom assignments for this device
-        assignments = db.query(db_models.DeviceAssignment).filter(
-            db_models.DeviceAssignment.device_id == device.id
-        ).all()
         
         classrooms = []
-        for assignment in assignments:
-            classroom = db.query(db_models.Class).filter(
-                db_models.Class.id == assignment.classroom_id
-            ).first()
+        for assignment in device.assignments:
+            classroom = assignment.classroom
             
             if classroom:
                 classrooms.append({
@@ -332,101 +557,90 @@ async def get_user_devices(
             "nickname": bookmark.nickname,  # Use bookmark's nickname
             "is_active": device.is_active,
             "battery_level": device.battery_level,
-            "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-            "created_at": device.created_at.isoformat() if device.created_at else None,
+            "last_seen": device.last_seen,
+            "created_at": device.created_at,
             "classrooms": classrooms
         })
     
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="User devices retrieved successfully",
-            data=devices_data
-        ).dict(),
+    return success_response(
+        message="User devices retrieved successfully",
+        data=devices_data,
         status_code=status.HTTP_200_OK,
     )
 
 # Get classroom devices
 @router.get("/classroom/{classroom_id}/devices", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_classroom_devices(
+def get_classroom_devices(
     classroom_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Check if user is a teacher and owns the classroom
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == classroom_id
-    ).first()
-    
-    if not classroom:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Classroom not found",
-                error_type="classroom_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    classroom_owner_id = get_classroom_owner_id(db, classroom_id)
     
-    if classroom.owner_id != current_user.user_id:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Only classroom owner can view devices",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
+    if not classroom_owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
     
-    # Get all device assignments for this classroom
-    assignments = db.query(db_models.DeviceAssignment).filter(
-        db_models.DeviceAssignment.classroom_id == classroom_id
-    ).all()
+    if classroom_owner_id != current_user.user_id:
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Only classroom owner can view devices", error_type="unauthorized")
     
-    assignments_data = []
-    for assignment in assignments:
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == assignment.device_id
-        ).first()
-        
-        if device:
-            # Get the teacher's bookmark for this device to get their custom nickname
-            bookmark = db.query(db_models.DeviceBookmark).filter(
-                db_models.DeviceBookmark.device_id == device.id,
+    # Get all device assignments for this classroom together with their device and
+    # the teacher's bookmark (for the custom nickname) in a single query, read from
+    # the cursor in chunks rather than loaded all at once
+    rows = db.execute(
+        select(
+            db_models.DeviceAssignment.id,
+            db_models.DeviceAssignment.device_id,
+            db_models.DeviceAssignment.classroom_id,
+            db_models.DeviceAssignment.assignment_type,
+            db_models.DeviceAssignment.assignment_id,
+            db_models.Device.mac_address,
+            db_models.Device.is_active,
+            db_models.Device.battery_level,
+            db_models.Device.last_seen,
+            db_models.DeviceBookmark.nickname
+        ).join(
+            db_models.Device, db_models.Device.id == db_models.DeviceAssignment.device_id
+        ).outerjoin(
+            db_models.DeviceBookmark, and_(
+                db_models.DeviceBookmark.device_id == db_models.Device.id,
                 db_models.DeviceBookmark.user_id == current_user.user_id
-            ).first()
-            
-            # Use bookmark nickname if available, otherwise use MAC address
-            display_nickname = bookmark.nickname if bookmark else f"Device {device.mac_address[-4:]}"
-            
-            assignments_data.append({
-                "id": assignment.id,
-                "device_id": assignment.device_id,
-                "classroom_id": assignment.classroom_id,
-                "assignment_type": assignment.assignment_type,
-                "assignment_id": assignment.assignment_id,
+            )
+        ).where(
+            db_models.DeviceAssignment.classroom_id == classroom_id
+        ).execution_options(yield_per=100)
+    )
+    
+    def stream_body():
+        # Same envelope as success_response(), written one assignment at a time
+        yield b'{"success":true,"message":"Classroom devices retrieved successfully","data":['
+        separator = b''
+        for row in rows:
+            assignment = {
+                "id": row.id,
+                "device_id": row.device_id,
+                "classroom_id": row.classroom_id,
+                "assignment_type": row.assignment_type,
+                "assignment_id": row.assignment_id,
                 "device": {
-                    "id": device.id,
-                    "mac_address": device.mac_address,
-                    "nickname": display_nickname,
-                    "is_active": device.is_active,
-                    "battery_level": device.battery_level,
-                    "last_seen": device.last_seen.isoformat() if device.last_seen else None
+                    "id": row.device_id,
+                    "mac_address": row.mac_address,
+                    # Use bookmark nickname if available, otherwise use MAC address
+                    "nickname": row.nickname or f"Device {row.mac_address[-4:]}",
+                    "is_active": row.is_active,
+                    "battery_level": row.battery_level,
+                    "last_seen": row.last_seen
                 }
-            })
+            }
+            yield separator + orjson.dumps(assignment)
+            separator = b','
+        yield b'],"error":null,"error_type":null}'
     
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="Classroom devices retrieved successfully",
-            data=assignments_data
-        ).dict(),
-        status_code=status.HTTP_200_OK,
-    )
+    return StreamingResponse(stream_body(), media_type="application/json", status_code=status.HTTP_200_OK)
 
 # Assign device to classroom
 @router.post("/{device_id}/assign", tags=["device"], status_code=status.HTTP_200_OK)
-async def assign_device(
+def assign_device(
     device_id: str,
     payload: DeviceAssign,
     current_user: db_models.User = Depends(get_current_user),
@@ -435,192 +649,111 @@ async def assign_device(
     # Validate assignment type
     is_valid_type, type_error = validate_assignment_type(payload.assignment_type)
     if not is_valid_type:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=type_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, type_error, error_type="validation_error")
     
-    # Check if device exists
-    device = db.query(db_models.Device).filter(
-        db_models.Device.id == device_id
-    ).first()
+    # Device, bookmark and classroom ownership checks in one round trip
+    device_exists, has_bookmark, classroom_owner_id = db.execute(select(
+        exists().where(db_models.Device.id == device_id),
+        _is_bookmarked(device_id, current_user.user_id),
+        select(db_models.Class.owner_id).where(
+            db_models.Class.id == payload.classroom_id
+        ).scalar_subquery()
+    )).one()
     
-    if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    if not device_exists:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
-    # Check if user has a bookmark for this device
-    bookmark = db.query(db_models.DeviceBookmark).filter(
-        db_models.DeviceBookmark.device_id == device_id,
-        db_models.DeviceBookmark.user_id == current_user.user_id
-    ).first()
+    if not has_bookmark:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not bookmarked by this user", error_type="device_not_bookmarked")
     
-    if not bookmark:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not bookmarked by this user",
-                error_type="device_not_bookmarked"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    # Check if classroom exists and user owns it
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == payload.classroom_id
-    ).first()
+    if not classroom_owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
     
-    if not classroom:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Classroom not found",
-                error_type="classroom_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    if classroom.owner_id != current_user.user_id:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Only classroom owner can assign devices",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
-    
-    # Check if device is already assigned to this classroom
-    existing_assignment = db.query(db_models.DeviceAssignment).filter(
-        db_models.DeviceAssignment.device_id == device_id,
-        db_models.DeviceAssignment.classroom_id == payload.classroom_id
-    ).first()
-    
-    if existing_assignment:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device is already assigned to this classroom",
-                error_type="duplicate_assignment"
-            ).dict(),
-            status_code=status.HTTP_409_CONFLICT,
-        )
+    if classroom_owner_id != current_user.user_id:
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Only classroom owner can assign devices", error_type="unauthorized")
     
-    # Create new assignment
+    # Create new assignment; the (device_id, classroom_id) unique constraint rejects
+    # duplicates, so there is no separate existence check to race against
+    assignment_id = uuid7()
+    created_at = datetime.utcnow()  # set here so the response needs no refresh
     new_assignment = db_models.DeviceAssignment(
-        id=str(uuid.uuid4()),
+        id=assignment_id,
         device_id=device_id,
         classroom_id=payload.classroom_id,
         assignment_type=payload.assignment_type,
-        assignment_id=payload.assignment_id
+        assignment_id=payload.assignment_id,
+        created_at=created_at
     )
     
     try:
         db.add(new_assignment)
         db.commit()
-        db.refresh(new_assignment)
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device assigned successfully",
-                data={
-                    "id": new_assignment.id,
-                    "device_id": new_assignment.device_id,
-                    "classroom_id": new_assignment.classroom_id,
-                    "assignment_type": new_assignment.assignment_type,
-                    "assignment_id": new_assignment.assignment_id,
-                    "created_at": new_assignment.created_at.isoformat() if new_assignment.created_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="Device assigned successfully",
+            data={
+                "id": assignment_id,
+                "device_id": device_id,
+                "classroom_id": payload.classroom_id,
+                "assignment_type": payload.assignment_type,
+                "assignment_id": payload.assignment_id,
+                "created_at": created_at
+            },
             status_code=status.HTTP_200_OK,
         )
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, db_models.DeviceAssignment, "unique_device_classroom_assignment"):
+            return error_response(status.HTTP_409_CONFLICT, "Device is already assigned to this classroom", error_type="duplicate_assignment")
+        # e.g. the classroom or device was deleted concurrently
+        logger.error("Device assignment failed: %s", e.orig)
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to assign device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to assign device",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to assign device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Unassign device from classroom
 @router.delete("/{device_id}/unassign", tags=["device"], status_code=status.HTTP_200_OK)
-async def unassign_device(
+def unassign_device(
     device_id: str,
     classroom_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Check if device exists and user has a bookmark for it
-    device_bookmark = db.query(db_models.DeviceBookmark).filter(
-        db_models.DeviceBookmark.device_id == device_id,
-        db_models.DeviceBookmark.user_id == current_user.user_id
-    ).first()
-    
-    if not device_bookmark:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found or not accessible",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    # Find the assignment
-    assignment = db.query(db_models.DeviceAssignment).filter(
-        db_models.DeviceAssignment.device_id == device_id,
-        db_models.DeviceAssignment.classroom_id == classroom_id
-    ).first()
-    
-    if not assignment:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device is not assigned to this classroom",
-                error_type="assignment_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
     try:
-        db.delete(assignment)
+        # Delete the assignment only if the user has bookmarked the device; the
+        # affected row count tells us whether there was anything to remove
+        result = db.execute(
+            delete(db_models.DeviceAssignment).where(
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.DeviceAssignment.classroom_id == classroom_id,
+                _is_bookmarked(device_id, current_user.user_id)
+            )
+        )
+        
+        if result.rowcount == 0:
+            db.rollback()
+            # Nothing deleted: work out which check failed
+            has_bookmark = db.query(_is_bookmarked(device_id, current_user.user_id)).scalar()
+            
+            if not has_bookmark:
+                return error_response(status.HTTP_404_NOT_FOUND, "Device not found or not accessible", error_type="device_not_found")
+            
+            return error_response(status.HTTP_404_NOT_FOUND, "Device is not assigned to this classroom", error_type="assignment_not_found")
+        
         db.commit()
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device unassigned successfully"
-            ).dict(),
+        return success_response(
+            message="Device unassigned successfully",
             status_code=status.HTTP_200_OK,
         )
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to unassign device",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to unassign device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Update device assignment
 @router.put("/{device_id}/assignment", tags=["device"], status_code=status.HTTP_200_OK)
-async def update_device_assignment(
+def update_device_assignment(
     device_id: str,
     payload: DeviceAssign,
     current_user: db_models.User = Depends(get_current_user),
@@ -629,188 +762,114 @@ async def update_device_assignment(
     # Validate assignment type
     is_valid_type, type_error = validate_assignment_type(payload.assignment_type)
     if not is_valid_type:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=type_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
-    
-    # Check if device exists and belongs to user through DeviceBookmark
-    bookmark = db.query(db_models.DeviceBookmark).filter(
-        db_models.DeviceBookmark.device_id == device_id,
-        db_models.DeviceBookmark.user_id == current_user.user_id
-    ).first()
-    
-    if not bookmark:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found or access denied",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    # Check if classroom exists and user owns it
-    classroom = db.query(db_models.Class).filter(
-        db_models.Class.id == payload.classroom_id
-    ).first()
-    
-    if not classroom:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Classroom not found",
-                error_type="classroom_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, type_error, error_type="validation_error")
     
-    if classroom.owner_id != current_user.user_id:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Unauthorized - Only classroom owner can update device assignments",
-                error_type="unauthorized"
-            ).dict(),
-            status_code=status.HTTP_403_FORBIDDEN,
-        )
-    
-    # Find the existing assignment
-    assignment = db.query(db_models.DeviceAssignment).filter(
-        db_models.DeviceAssignment.device_id == device_id,
-        db_models.DeviceAssignment.classroom_id == payload.classroom_id
-    ).first()
-    
-    if not assignment:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device is not assigned to this classroom",
-                error_type="assignment_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+    has_bookmark = _is_bookmarked(device_id, current_user.user_id)
+    owns_classroom = exists().where(
+        db_models.Class.id == payload.classroom_id,
+        db_models.Class.owner_id == current_user.user_id
+    )
     
     try:
-        # Update the assignment
-        assignment.assignment_type = payload.assignment_type
-        assignment.assignment_id = payload.assignment_id
-        db.commit()
+        # Update in one statement; the bookmark and classroom ownership checks are part of the WHERE clause
+        result = db.execute(
+            update(db_models.DeviceAssignment).where(
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.DeviceAssignment.classroom_id == payload.classroom_id,
+                has_bookmark,
+                owns_classroom
+            ).values(
+                assignment_type=payload.assignment_type,
+                assignment_id=payload.assignment_id
+            )
+        )
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
+        if result.rowcount:
+            db.commit()
+            return success_response(
                 message="Device assignment updated successfully",
                 data={
                     "device_id": device_id,
                     "classroom_id": payload.classroom_id,
                     "assignment_type": payload.assignment_type,
                     "assignment_id": payload.assignment_id
-                }
-            ).dict(),
-            status_code=status.HTTP_200_OK,
-        )
+                },
+                status_code=status.HTTP_200_OK,
+            )
+        
+        db.rollback()
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to update device assignment",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to update device assignment", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    # Nothing updated: work out which check failed
+    if not db.query(has_bookmark).scalar():
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found or access denied", error_type="device_not_found")
+    
+    classroom_owner_id = get_classroom_owner_id(db, payload.classroom_id)
+    
+    if not classroom_owner_id:
+        return error_response(status.HTTP_404_NOT_FOUND, "Classroom not found", error_type="classroom_not_found")
+    
+    if classroom_owner_id != current_user.user_id:
+        return error_response(status.HTTP_403_FORBIDDEN, "Unauthorized - Only classroom owner can update device assignments", error_type="unauthorized")
+    
+    return error_response(status.HTTP_404_NOT_FOUND, "Device is not assigned to this classroom", error_type="assignment_not_found")
 
 # Remove device bookmark (unbookmark device)
 @router.delete("/{device_id}", tags=["device"], status_code=status.HTTP_200_OK)
-async def delete_device(
+def delete_device(
     device_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Check if device exists
-    device = db.query(db_models.Device).filter(
-        db_models.Device.id == device_id
-    ).first()
-    
-    if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    # Check if user has a bookmark for this device
-    bookmark = db.query(db_models.DeviceBookmark).filter(
-        db_models.DeviceBookmark.device_id == device_id,
-        db_models.DeviceBookmark.user_id == current_user.user_id
-    ).first()
-    
-    if not bookmark:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not bookmarked by this user",
-                error_type="bookmark_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
-    
-    # Check if device has any classroom assignments by this user
+    # Device is still assigned to one of this user's classrooms
     # (We only check assignments in classrooms owned by this user)
-    user_classrooms = db.query(db_models.Class).filter(
-        db_models.Class.owner_id == current_user.user_id
-    ).all()
-    
-    user_classroom_ids = [c.id for c in user_classrooms]
-    assignments = db.query(db_models.DeviceAssignment).filter(
+    assigned_to_user_classroom = exists().where(
         db_models.DeviceAssignment.device_id == device_id,
-        db_models.DeviceAssignment.classroom_id.in_(user_classroom_ids)
-    ).all()
-    
-    if assignments:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Cannot remove device bookmark while it's assigned to your classrooms. Please unassign from all classrooms first.",
-                error_type="device_has_assignments"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        db_models.DeviceAssignment.classroom_id == db_models.Class.id,
+        db_models.Class.owner_id == current_user.user_id
+    )
     
     try:
-        # Remove the bookmark
-        db.delete(bookmark)
-        db.commit()
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device bookmark removed successfully"
-            ).dict(),
-            status_code=status.HTTP_200_OK,
+        # Remove the bookmark in one statement unless the device is still assigned
+        result = db.execute(
+            delete(db_models.DeviceBookmark).where(
+                db_models.DeviceBookmark.device_id == device_id,
+                db_models.DeviceBookmark.user_id == current_user.user_id,
+                ~assigned_to_user_classroom
+            )
         )
+        
+        if result.rowcount:
+            db.commit()
+            return success_response(
+                message="Device bookmark removed successfully",
+                status_code=status.HTTP_200_OK,
+            )
+        
+        db.rollback()
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to remove device bookmark",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to remove device bookmark", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    # Nothing deleted: work out which check failed
+    device_exists, has_bookmark = db.execute(select(
+        exists().where(db_models.Device.id == device_id),
+        _is_bookmarked(device_id, current_user.user_id)
+    )).one()
+    
+    if not device_exists:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
+    
+    if not has_bookmark:
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not bookmarked by this user", error_type="bookmark_not_found")
+    
+    return error_response(status.HTTP_400_BAD_REQUEST, "Cannot remove device bookmark while it's assigned to your classrooms. Please unassign from all classrooms first.", error_type="device_has_assignments")
 
 # Get device by ID for anonymous students
 @router.get("/{device_id}/anonymous", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_device_anonymous(
+def get_device_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -822,84 +881,40 @@ async def get_device_anonymous(
     """
     try:
         # Verify anonymous student exists and has access to the classroom
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
         
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error=error_resp(code=status.HTTP_401_UNAUTHORIZED)
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_code=status.HTTP_401_UNAUTHORIZED)
         
         # Find the device
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == device_id
-        ).first()
+        device_data = _device_payload(db, device_id)
         
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error=error_resp(code=status.HTTP_404_NOT_FOUND)
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        if not device_data:
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_code=status.HTTP_404_NOT_FOUND)
         
         # Check if device is assigned to the classroom the anonymous student is in
-        device_assignment = db.query(db_models.DeviceAssignment).filter(
-            db_models.DeviceAssignment.device_id == device_id,
-            db_models.DeviceAssignment.classroom_id == class_id
-        ).first()
-        
-        if not device_assignment:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not assigned to this classroom",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
+        is_assigned = db.query(
+            exists().where(
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.DeviceAssignment.classroom_id == class_id
             )
+        ).scalar()
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device retrieved successfully",
-                data={
-                    "id": device.id,
-                    "mac_address": device.mac_address,
-                    "nickname": None,  # Anonymous users don't have nicknames
-                    "is_active": device.is_active,
-                    "battery_level": device.battery_level,
-                    "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-                    "created_at": device.created_at.isoformat(),
-                    "updated_at": device.updated_at.isoformat() if device.updated_at else None
-                }
-            ).dict(),
+        if not is_assigned:
+            return error_response(status.HTTP_403_FORBIDDEN, "Device not assigned to this classroom", error_code=status.HTTP_403_FORBIDDEN)
+        
+        return success_response(
+            message="Device retrieved successfully",
+            data=device_data,  # Anonymous users don't have nicknames
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get device by ID
 @router.get("/{device_id}", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_device(
+def get_device(
     device_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -909,278 +924,248 @@ async def get_device(
     """
     try:
         # Find the device
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == device_id
-        ).first()
-        
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error=error_resp(code=status.HTTP_404_NOT_FOUND)
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        device_data = _device_payload(db, device_id)
         
-        # Check if user has access to this device
-        # User can access if they have bookmarked the device or if it's assigned to a classroom they're in
-        has_access = False
+        if not device_data:
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_code=status.HTTP_404_NOT_FOUND)
         
-        # Check if user has bookmarked this device
-        device_bookmark = db.query(db_models.DeviceBookmark).filter(
-            db_models.DeviceBookmark.device_id == device_id,
-            db_models.DeviceBookmark.user_id == current_user.user_id
-        ).first()
-        
-        if device_bookmark:
-            has_access = True
-        else:
-            # Check if device is assigned to a classroom the user is in
-            classroom_access = db.query(db_models.DeviceAssignment).join(
-                db_models.ClassMember,
-                db_models.DeviceAssignment.classroom_id == db_models.ClassMember.class_id
-            ).filter(
+        # Check if user has access to this device, in one query: they have bookmarked it
+        # (which also gives their nickname) or it's assigned to a classroom they're in
+        nickname, classroom_access = db.execute(select(
+            select(db_models.DeviceBookmark.nickname).where(
+                db_models.DeviceBookmark.device_id == device_id,
+                db_models.DeviceBookmark.user_id == current_user.user_id
+            ).scalar_subquery(),
+            exists().where(
+                db_models.DeviceAssignment.classroom_id == db_models.ClassMember.class_id,
                 db_models.DeviceAssignment.device_id == device_id,
                 db_models.ClassMember.user_id == current_user.user_id
-            ).first()
-            
-            if classroom_access:
-                has_access = True
-        
-        if not has_access:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied to device",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
             )
+        )).one()
+        has_access = nickname is not None or classroom_access
         
-        # Get user's nickname for this device (if bookmarked)
-        nickname = device_bookmark.nickname if device_bookmark else None
+        if not has_access:
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied to device", error_code=status.HTTP_403_FORBIDDEN)
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device retrieved successfully",
-                data={
-                    "id": device.id,
-                    "mac_address": device.mac_address,
-                    "nickname": nickname,
-                    "is_active": device.is_active,
-                    "battery_level": device.battery_level,
-                    "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-                    "created_at": device.created_at.isoformat(),
-                    "updated_at": device.updated_at.isoformat() if device.updated_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="Device retrieved successfully",
+            data=dict(device_data, nickname=nickname),
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get device by MAC address
 @router.get("/mac/{mac_address}", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_device_by_mac(
+def get_device_by_mac(
     mac_address: str,
     db: Session = Depends(get_db)
 ):
     # Validate MAC address format
     is_valid_mac, mac_error = validate_mac_address(mac_address)
     if not is_valid_mac:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message=mac_error,
-                error_type="validation_error"
-            ).dict(),
-            status_code=status.HTTP_400_BAD_REQUEST,
-        )
+        return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
+    
+    mac_address = normalize_mac_address(mac_address)
+    
+    # Devices poll this on every boot/heartbeat; serve repeat lookups from the cache
+    device_data = devices_by_mac.get(mac_address)
+    if device_data is not None:
+        return success_response(message="Device found", data=device_data)
     
     # Find device by MAC address
-    device = db.query(db_models.Device).filter(
+    device = db.query(db_models.Device).options(*strict_load()).filter(
         db_models.Device.mac_address == mac_address
     ).first()
     
     if not device:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Device not found",
-                error_type="device_not_found"
-            ).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+        return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_type="device_not_found")
     
-    return JSONResponse(
-        content=api_resp(
-            success=True,
-            message="Device found",
-            data={
-                "id": device.id,
-                "mac_address": device.mac_address,
-                "nickname": None,  # No user context for MAC lookup
-                "is_active": device.is_active,
-                "battery_level": device.battery_level,
-                "last_seen": device.last_seen.isoformat() if device.last_seen else None
-            }
-        ).dict(),
+    device_data = {
+        "id": device.id,
+        "mac_address": device.mac_address,
+        "nickname": None,  # No user context for MAC lookup
+        "is_active": device.is_active,
+        "battery_level": device.battery_level,
+        "last_seen": device.last_seen
+    }
+    devices_by_mac.set(mac_address, device_data)
+    
+    return success_response(
+        message="Device found",
+        data=device_data,
         status_code=status.HTTP_200_OK,
     )
 
 # Device Data Endpoints
 
 @router.post("/data", tags=["device"], status_code=status.HTTP_201_CREATED)
-async def add_device_data(
+def add_device_data(
     payload: DeviceDataInput,
     db: Session = Depends(get_db)
 ):
     """
     Add new sensor data for a device.
     This endpoint is designed to be called by external devices.
+    Devices that buffer readings should send them to /device/data/batch instead:
+    one request, one multi-row INSERT and one commit for the whole buffer.
     """
     try:
-        # Verify device exists
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == payload.device_id
-        ).first()
-        
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error=error_resp(code=status.HTTP_404_NOT_FOUND)
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        # Verify device exists (its MAC address is only needed to drop the cached payload)
+        mac_address = db.execute(
+            select(db_models.Device.mac_address).where(db_models.Device.id == payload.device_id)
+        ).scalar()
+        
+        if not mac_address:
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_code=status.HTTP_404_NOT_FOUND)
+        
+        # Plain INSERT/UPDATE statements: no ORM instances or unit-of-work flush for a write-only path
+        reading_id = uuid7()
+        db.execute(insert(db_models.DeviceData), {
+            "id": reading_id,
+            "device_id": payload.device_id,
+            "timestamp": payload.timestamp,
+            "temperature": payload.temperature,
+            "thermometer": payload.thermometer,
+            "humidity": payload.humidity,
+            "moisture": payload.moisture,
+            "light": payload.light,
+            "sound": payload.sound
+        })
         
-        # Create new device data record
-        device_data = db_models.DeviceData(
-            id=str(uuid.uuid4()),
-            device_id=payload.device_id,
-            timestamp=payload.timestamp,
-            temperature=payload.temperature,
-            thermometer=payload.thermometer,
-            humidity=payload.humidity,
-            moisture=payload.moisture,
-            light=payload.light,
-            sound=payload.sound
+        # Update device last_seen
+        db.execute(
+            update(db_models.Device).where(db_models.Device.id == payload.device_id).values(last_seen=payload.timestamp)
         )
         
-        db.add(device_data)
-        
-        # Update device last_seen and battery if provided
-        device.last_seen = payload.timestamp
-        
         db.commit()
-        db.refresh(device_data)
+        devices_by_mac.delete(mac_address)
+        devices_by_id.delete(payload.device_id)
+        latest_readings.delete(payload.device_id)
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device data added successfully",
-                data={
-                    "id": device_data.id,
-                    "device_id": device_data.device_id,
-                    "timestamp": device_data.timestamp.isoformat(),
-                    "temperature": float(device_data.temperature) if device_data.temperature else None,
-                    "thermometer": float(device_data.thermometer) if device_data.thermometer else None,
-                    "humidity": float(device_data.humidity) if device_data.humidity else None,
-                    "moisture": float(device_data.moisture) if device_data.moisture else None,
-                    "light": float(device_data.light) if device_data.light else None,
-                    "sound": float(device_data.sound) if device_data.sound else None
-                }
-            ).dict(),
+        # Every value is already known, so the response needs no read-back of the row
+        return success_response(
+            message="Device data added successfully",
+            data={
+                "id": reading_id,
+                "device_id": payload.device_id,
+                "timestamp": payload.timestamp,
+                "temperature": payload.temperature,
+                "thermometer": payload.thermometer,
+                "humidity": payload.humidity,
+                "moisture": payload.moisture,
+                "light": payload.light,
+                "sound": payload.sound
+            },
             status_code=status.HTTP_201_CREATED,
         )
         
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to add device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to add device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@router.post("/data/batch", tags=["device"], status_code=status.HTTP_201_CREATED, openapi_extra=json_body_docs(DeviceDataBatch))
+def add_device_data_batch(
+    payload: DeviceDataBatch = Depends(json_body(DeviceDataBatch)),
+    db: Session = Depends(get_db)
+):
+    """
+    Add up to 100 sensor readings, for one or more devices, in a single request.
+    All readings are written with one multi-row INSERT and one commit.
+    """
+    device_ids = {reading.device_id for reading in payload.readings}
+    
+    # Verify every device exists (one query for the whole batch)
+    mac_addresses = dict(
+        db.query(db_models.Device.id, db_models.Device.mac_address).filter(
+            db_models.Device.id.in_(device_ids)
+        ).all()
+    )
+    missing = device_ids - mac_addresses.keys()
+    if missing:
+        return error_response(status.HTTP_404_NOT_FOUND, f"Device not found: {', '.join(sorted(missing))}", error_type="device_not_found")
+    
+    # Newest reading per device becomes its last_seen
+    last_seen = {}
+    for reading in payload.readings:
+        if reading.device_id not in last_seen or reading.timestamp > last_seen[reading.device_id]:
+            last_seen[reading.device_id] = reading.timestamp
+    
+    try:
+        db.execute(insert(db_models.DeviceData), [
+            {
+                "id": uuid7(),
+                "device_id": reading.device_id,
+                "timestamp": reading.timestamp,
+                "temperature": reading.temperature,
+                "thermometer": reading.thermometer,
+                "humidity": reading.humidity,
+                "moisture": reading.moisture,
+                "light": reading.light,
+                "sound": reading.sound
+            }
+            for reading in payload.readings
+        ])
+        db.execute(
+            # Core UPDATE on the table: an executemany with one parameter set per device
+            update(db_models.Device.__table__).where(
+                db_models.Device.__table__.c.id == bindparam("b_device_id")
+            ).values(last_seen=bindparam("b_last_seen")),
+            [{"b_device_id": device_id, "b_last_seen": timestamp} for device_id, timestamp in last_seen.items()]
         )
+        db.commit()
+    except Exception:
+        db.rollback()
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to add device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    for device_id, mac_address in mac_addresses.items():
+        devices_by_mac.delete(mac_address)
+        devices_by_id.delete(device_id)
+        latest_readings.delete(device_id)
+    
+    return success_response(
+        message=f"Recorded {len(payload.readings)} readings",
+        data={
+            "recorded_count": len(payload.readings),
+            "device_ids": sorted(device_ids)
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
 
 @router.get("/{device_id}/data", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_device_data(
+def get_device_data(
     device_id: str,
     start_time: Optional[datetime] = Query(None, description="Start time for data range"),
     end_time: Optional[datetime] = Query(None, description="End time for data range"),
     limit: int = Query(100, description="Maximum number of records to return", ge=1, le=1000),
+    before: Optional[datetime] = Query(None, description="Page cursor: timestamp from the previous page's next_cursor"),
+    before_id: Optional[str] = Query(None, description="Page cursor: id from the previous page's next_cursor; requires before"),
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get device sensor data with optional time filtering.
+    Pages are keyset-based: pass the returned next_cursor back as before/before_id to
+    continue from the last reading, which costs the same index seek at any depth.
     """
+    # before_id only breaks ties within a timestamp; alone it would silently restart at the first page
+    if before_id is not None and before is None:
+        return error_response(status.HTTP_400_BAD_REQUEST, "before_id requires before", error_type="validation_error")
+    
     try:
-        # Verify device exists and user has access
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == device_id
-        ).first()
-        
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error=error_resp(code=status.HTTP_404_NOT_FOUND)
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        # Verify device exists and user has access: a bookmark, or an assignment
+        # to a classroom the user is in
+        device_exists, has_access = _device_access(db, device_id, current_user.user_id)
         
-        # Check if user has access to this device
-        # User can access if they have bookmarked the device or if it's assigned to a classroom they're in
-        has_access = False
-        
-        # Check if user has bookmarked this device
-        device_bookmark = db.query(db_models.DeviceBookmark).filter(
-            db_models.DeviceBookmark.device_id == device_id,
-            db_models.DeviceBookmark.user_id == current_user.user_id
-        ).first()
-        
-        if device_bookmark:
-            has_access = True
-        else:
-            # Check if device is assigned to a classroom the user is in
-            classroom_access = db.query(db_models.DeviceAssignment).join(
-                db_models.ClassMember,
-                db_models.DeviceAssignment.classroom_id == db_models.ClassMember.class_id
-            ).filter(
-                db_models.DeviceAssignment.device_id == device_id,
-                db_models.ClassMember.user_id == current_user.user_id
-            ).first()
-            
-            if classroom_access:
-                has_access = True
+        if not device_exists:
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_code=status.HTTP_404_NOT_FOUND)
         
         if not has_access:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied to device data",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied to device data", error_code=status.HTTP_403_FORBIDDEN)
         
         # Build query
-        query = db.query(db_models.DeviceData).filter(
+        query = db.query(*_DEVICE_DATA_COLUMNS).filter(
             db_models.DeviceData.device_id == device_id
         )
         
@@ -1190,51 +1175,60 @@ async def get_device_data(
         if end_time:
             query = query.filter(db_models.DeviceData.timestamp <= end_time)
         
-        # Get data ordered by timestamp (newest first)
-        data_records = query.order_by(desc(db_models.DeviceData.timestamp)).limit(limit).all()
-        
-        # Format response data
+        if before:
+            # Continue after the previous page's last reading; the id breaks ties between
+            # readings that share a timestamp so none are skipped or repeated
+            if before_id:
+                query = query.filter(or_(
+                    db_models.DeviceData.timestamp < before,
+                    and_(db_models.DeviceData.timestamp == before, db_models.DeviceData.id < before_id)
+                ))
+            else:
+                query = query.filter(db_models.DeviceData.timestamp < before)
+        
+        # Get data ordered by timestamp (newest first), fetched from the cursor in chunks
+        # while the response list is built instead of materialized as a row list first
+        data_records = query.order_by(
+            desc(db_models.DeviceData.timestamp), desc(db_models.DeviceData.id)
+        ).limit(limit).yield_per(200)
+        
+        # Format response data; datetimes are left to orjson, which formats them natively
         data_list = []
         for record in data_records:
             data_list.append({
                 "id": record.id,
                 "device_id": record.device_id,
-                "timestamp": record.timestamp.isoformat(),
-                "temperature": float(record.temperature) if record.temperature else None,
-                "thermometer": float(record.thermometer) if record.thermometer else None,
-                "humidity": float(record.humidity) if record.humidity else None,
-                "moisture": float(record.moisture) if record.moisture else None,
-                "light": float(record.light) if record.light else None,
-                "sound": float(record.sound) if record.sound else None,
-                "created_at": record.created_at.isoformat()
+                "timestamp": record.timestamp,
+                "temperature": record.temperature,
+                "thermometer": record.thermometer,
+                "humidity": record.humidity,
+                "moisture": record.moisture,
+                "light": record.light,
+                "sound": record.sound,
+                "created_at": record.created_at
             })
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "total_records": len(data_list),
-                    "data": data_list
-                }
-            ).dict(),
+        return success_response(
+            message="Device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "total_records": len(data_list),
+                "data": data_list,
+                # A full page may have more behind it; None once the history is exhausted
+                "next_cursor": {
+                    "before": data_list[-1]["timestamp"],
+                    "before_id": data_list[-1]["id"]
+                } if len(data_list) == limit else None
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get latest device data for anonymous students
 @router.get("/{device_id}/data/latest/anonymous", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_latest_device_data_anonymous(
+def get_latest_device_data_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -1246,88 +1240,44 @@ async def get_latest_device_data_anonymous(
     """
     try:
         # Verify anonymous student exists and has access to the classroom
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
         
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error=error_resp(code=status.HTTP_401_UNAUTHORIZED)
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_code=status.HTTP_401_UNAUTHORIZED)
         
         # Check if device is assigned to the classroom
-        device_assignment = db.query(db_models.DeviceAssignment).filter(
-            db_models.DeviceAssignment.device_id == device_id,
-            db_models.DeviceAssignment.classroom_id == class_id
-        ).first()
-        
-        if not device_assignment:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not assigned to this classroom",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
+        is_assigned = db.query(
+            exists().where(
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.DeviceAssignment.classroom_id == class_id
             )
+        ).scalar()
+        
+        if not is_assigned:
+            return error_response(status.HTTP_403_FORBIDDEN, "Device not assigned to this classroom", error_code=status.HTTP_403_FORBIDDEN)
         
         # Get latest device data
-        latest_data = db.query(db_models.DeviceData).filter(
-            db_models.DeviceData.device_id == device_id
-        ).order_by(db_models.DeviceData.timestamp.desc()).first()
+        latest_data = _latest_reading(db, device_id)
         
         if not latest_data:
-            return JSONResponse(
-                content=api_resp(
-                    success=True,
-                    message="No data available for this device",
-                    data={"data": None}
-                ).dict(),
+            return success_response(
+                message="No data available for this device",
+                data={"data": None},
                 status_code=status.HTTP_200_OK,
             )
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Latest device data retrieved successfully",
-                data={
-                    "data": {
-                        "id": latest_data.id,
-                        "device_id": latest_data.device_id,
-                        "timestamp": latest_data.timestamp.isoformat(),
-                        "temperature": float(latest_data.temperature) if latest_data.temperature else None,
-                        "thermometer": float(latest_data.thermometer) if latest_data.thermometer else None,
-                        "humidity": float(latest_data.humidity) if latest_data.humidity else None,
-                        "moisture": float(latest_data.moisture) if latest_data.moisture else None,
-                        "light": float(latest_data.light) if latest_data.light else None,
-                        "sound": float(latest_data.sound) if latest_data.sound else None,
-                        "created_at": latest_data.created_at.isoformat()
-                    }
-                }
-            ).dict(),
+        return success_response(
+            message="Latest device data retrieved successfully",
+            data={"data": latest_data},
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get device data with time filtering for anonymous students
 @router.get("/{device_id}/data/anonymous", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_device_data_anonymous(
+def get_device_data_anonymous(
     device_id: str,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -1342,40 +1292,24 @@ async def get_device_data_anonymous(
     """
     try:
         # Verify anonymous student exists and has access to the classroom
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
         
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Invalid student credentials",
-                    error=error_resp(code=status.HTTP_401_UNAUTHORIZED)
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Invalid student credentials", error_code=status.HTTP_401_UNAUTHORIZED)
         
         # Check if device is assigned to the classroom
-        device_assignment = db.query(db_models.DeviceAssignment).filter(
-            db_models.DeviceAssignment.device_id == device_id,
-            db_models.DeviceAssignment.classroom_id == class_id
-        ).first()
-        
-        if not device_assignment:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not assigned to this classroom",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
+        is_assigned = db.query(
+            exists().where(
+                db_models.DeviceAssignment.device_id == device_id,
+                db_models.DeviceAssignment.classroom_id == class_id
             )
+        ).scalar()
+        
+        if not is_assigned:
+            return error_response(status.HTTP_403_FORBIDDEN, "Device not assigned to this classroom", error_code=status.HTTP_403_FORBIDDEN)
         
         # Build query for device data
-        query = db.query(db_models.DeviceData).filter(
+        query = db.query(*_DEVICE_DATA_COLUMNS).filter(
             db_models.DeviceData.device_id == device_id
         )
         
@@ -1385,34 +1319,20 @@ async def get_device_data_anonymous(
                 start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
                 query = query.filter(db_models.DeviceData.timestamp >= start_dt)
             except ValueError:
-                return JSONResponse(
-                    content=api_resp(
-                        success=False,
-                        message="Invalid start_time format. Use ISO format.",
-                        error=error_resp(code=status.HTTP_400_BAD_REQUEST)
-                    ).dict(),
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                )
+                return error_response(status.HTTP_400_BAD_REQUEST, "Invalid start_time format. Use ISO format.", error_code=status.HTTP_400_BAD_REQUEST)
         
         if end_time:
             try:
                 end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
                 query = query.filter(db_models.DeviceData.timestamp <= end_dt)
             except ValueError:
-                return JSONResponse(
-                    content=api_resp(
-                        success=False,
-                        message="Invalid end_time format. Use ISO format.",
-                        error=error_resp(code=status.HTTP_400_BAD_REQUEST)
-                    ).dict(),
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                )
+                return error_response(status.HTTP_400_BAD_REQUEST, "Invalid end_time format. Use ISO format.", error_code=status.HTTP_400_BAD_REQUEST)
         
         # Order by timestamp and apply limit
         query = query.order_by(db_models.DeviceData.timestamp.desc()).limit(limit)
         
-        # Execute query
-        device_data = query.all()
+        # Execute query, fetching rows in chunks as they are transformed
+        device_data = query.yield_per(200)
         
         # Transform data
         data_list = []
@@ -1420,40 +1340,30 @@ async def get_device_data_anonymous(
             data_list.append({
                 "id": data.id,
                 "device_id": data.device_id,
-                "timestamp": data.timestamp.isoformat(),
-                "temperature": float(data.temperature) if data.temperature else None,
-                "thermometer": float(data.thermometer) if data.thermometer else None,
-                "humidity": float(data.humidity) if data.humidity else None,
-                "moisture": float(data.moisture) if data.moisture else None,
-                "light": float(data.light) if data.light else None,
-                "sound": float(data.sound) if data.sound else None,
-                "created_at": data.created_at.isoformat()
+                "timestamp": data.timestamp,
+                "temperature": data.temperature,
+                "thermometer": data.thermometer,
+                "humidity": data.humidity,
+                "moisture": data.moisture,
+                "light": data.light,
+                "sound": data.sound,
+                "created_at": data.created_at
             })
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Device data retrieved successfully",
-                data={
-                    "data": data_list,
-                    "count": len(data_list)
-                }
-            ).dict(),
+        return success_response(
+            message="Device data retrieved successfully",
+            data={
+                "data": data_list,
+                "count": len(data_list)
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @router.get("/{device_id}/data/latest", tags=["device"], status_code=status.HTTP_200_OK)
-async def get_latest_device_data(
+def get_latest_device_data(
     device_id: str,
     current_user: db_models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -1463,106 +1373,42 @@ async def get_latest_device_data(
     """
     try:
         # Verify device exists and user has access (same logic as above)
-        device = db.query(db_models.Device).filter(
-            db_models.Device.id == device_id
-        ).first()
-        
-        if not device:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Device not found",
-                    error=error_resp(code=status.HTTP_404_NOT_FOUND)
-                ).dict(),
-                status_code=status.HTTP_404_NOT_FOUND,
-            )
+        device_exists, has_access = _device_access(db, device_id, current_user.user_id)
         
-        # Check access (simplified for brevity - same logic as above)
-        # Check if user has bookmarked this device
-        device_bookmark = db.query(db_models.DeviceBookmark).filter(
-            db_models.DeviceBookmark.device_id == device_id,
-            db_models.DeviceBookmark.user_id == current_user.user_id
-        ).first()
+        if not device_exists:
+            return error_response(status.HTTP_404_NOT_FOUND, "Device not found", error_code=status.HTTP_404_NOT_FOUND)
         
-        has_access = device_bookmark is not None
         if not has_access:
-            # Check classroom access
-            classroom_access = db.query(db_models.DeviceAssignment).join(
-                db_models.ClassMember,
-                db_models.DeviceAssignment.classroom_id == db_models.ClassMember.class_id
-            ).filter(
-                db_models.DeviceAssignment.device_id == device_id,
-                db_models.ClassMember.user_id == current_user.user_id
-            ).first()
-            has_access = classroom_access is not None
-        
-        if not has_access:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Access denied to device data",
-                    error=error_resp(code=status.HTTP_403_FORBIDDEN)
-                ).dict(),
-                status_code=status.HTTP_403_FORBIDDEN,
-            )
+            return error_response(status.HTTP_403_FORBIDDEN, "Access denied to device data", error_code=status.HTTP_403_FORBIDDEN)
         
         # Get latest data record
-        latest_data = db.query(db_models.DeviceData).filter(
-            db_models.DeviceData.device_id == device_id
-        ).order_by(desc(db_models.DeviceData.timestamp)).first()
+        data_response = _latest_reading(db, device_id)
         
-        if not latest_data:
-            return JSONResponse(
-                content=api_resp(
-                    success=True,
-                    message="No data available for this device",
-                    data={
-                        "device_id": device_id,
-                        "data": None
-                    }
-                ).dict(),
+        if not data_response:
+            return success_response(
+                message="No data available for this device",
+                data={
+                    "device_id": device_id,
+                    "data": None
+                },
                 status_code=status.HTTP_200_OK,
             )
         
-        # Format response
-        data_response = {
-            "id": latest_data.id,
-            "device_id": latest_data.device_id,
-            "timestamp": latest_data.timestamp.isoformat(),
-            "temperature": float(latest_data.temperature) if latest_data.temperature else None,
-            "thermometer": float(latest_data.thermometer) if latest_data.thermometer else None,
-            "humidity": float(latest_data.humidity) if latest_data.humidity else None,
-            "moisture": float(latest_data.moisture) if latest_data.moisture else None,
-            "light": float(latest_data.light) if latest_data.light else None,
-            "sound": float(latest_data.sound) if latest_data.sound else None,
-            "created_at": latest_data.created_at.isoformat()
-        }
-        
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Latest device data retrieved successfully",
-                data={
-                    "device_id": device_id,
-                    "data": data_response
-                }
-            ).dict(),
+        return success_response(
+            message="Latest device data retrieved successfully",
+            data={
+                "device_id": device_id,
+                "data": data_response
+            },
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve latest device data",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve latest device data", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Register BLE device for anonymous students
 @router.post("/register-ble-anonymous", tags=["device"], status_code=status.HTTP_201_CREATED)
-async def register_ble_device_anonymous(
+def register_ble_device_anonymous(
     payload: BLEDeviceRegister,
     class_id: str = Query(..., description="Classroom ID"),
     first_name: str = Query(..., description="Student first name"),
@@ -1574,58 +1420,44 @@ async def register_ble_device_anonymous(
     """
     try:
         # Verify anonymous student exists and has access to the classroom
-        anonymous_student = db.query(db_models.AnonymousStudent).filter(
-            db_models.AnonymousStudent.class_id == class_id,
-            db_models.AnonymousStudent.first_name == first_name,
-            db_models.AnonymousStudent.pin_code == pin_code
-        ).first()
+        student_id = get_anonymous_student_id(db, class_id, first_name, pin_code)
         
-        if not anonymous_student:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Anonymous student not found or invalid credentials",
-                    error_type="authentication_error"
-                ).dict(),
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
+        if not student_id:
+            return error_response(status.HTTP_401_UNAUTHORIZED, "Anonymous student not found or invalid credentials", error_type="authentication_error")
         
         # Validate nickname
         is_valid_nickname, nickname_error = validate_nickname(payload.nickname)
         if not is_valid_nickname:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message=nickname_error,
-                    error_type="validation_error"
-                ).dict(),
-                status_code=status.HTTP_400_BAD_REQUEST,
-            )
+            return error_response(status.HTTP_400_BAD_REQUEST, nickname_error, error_type="validation_error")
+        
+        mac_address, mac_error = _ble_mac_address(payload.mac_address)
+        if mac_error:
+            return error_response(status.HTTP_400_BAD_REQUEST, mac_error, error_type="validation_error")
         
         # Create new device with UUID
         new_device = db_models.Device(
-            id=str(uuid.uuid4()),
-            mac_address=payload.mac_address,
+            id=uuid7(),
+            mac_address=mac_address,
             is_active=True,
             battery_level=payload.battery_level,
             device_type=payload.device_type,
-            description=payload.description
+            description=payload.description,
+            created_at=datetime.utcnow()  # set here so the response needs no refresh
         )
         db.add(new_device)
-        db.flush()  # Get the device ID
         
         # Create device bookmark for the anonymous student
         new_bookmark = db_models.DeviceBookmark(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             device_id=new_device.id,
-            user_id=anonymous_student.student_id,  # Use anonymous student ID
+            user_id=student_id,  # Use anonymous student ID
             nickname=payload.nickname
         )
         db.add(new_bookmark)
         
         # Assign device to the classroom
         new_assignment = db_models.DeviceAssignment(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             device_id=new_device.id,
             classroom_id=class_id,
             assignment_type='public',  # Anonymous students add devices as public
@@ -1635,34 +1467,30 @@ async def register_ble_device_anonymous(
         
         db.commit()
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="BLE device registered successfully for anonymous student",
-                data={
-                    "device_id": new_device.id,
-                    "mac_address": new_device.mac_address,
-                    "nickname": new_bookmark.nickname,
-                    "is_active": new_device.is_active,
-                    "battery_level": new_device.battery_level,
-                    "device_type": new_device.device_type,
-                    "description": new_device.description,
-                    "last_seen": new_device.last_seen.isoformat() if new_device.last_seen else None,
-                    "created_at": new_device.created_at.isoformat() if new_device.created_at else None
-                }
-            ).dict(),
+        return success_response(
+            message="BLE device registered successfully for anonymous student",
+            data={
+                "device_id": new_device.id,
+                "mac_address": new_device.mac_address,
+                "nickname": new_bookmark.nickname,
+                "is_active": new_device.is_active,
+                "battery_level": new_device.battery_level,
+                "device_type": new_device.device_type,
+                "description": new_device.description,
+                "last_seen": new_device.last_seen,
+                "created_at": new_device.created_at
+            },
             status_code=status.HTTP_201_CREATED,
         )
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, db_models.Device, "ux_devices_mac_address"):
+            return error_response(status.HTTP_409_CONFLICT, "A device with this MAC address is already registered", error_type="duplicate_device")
+        logger.error("Anonymous BLE device registration failed: %s", e.orig)
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to register BLE device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception as e:
         db.rollback()
         print(f"Anonymous BLE device registration error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to register BLE device",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to register BLE device", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Depends, status, Query
-from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import distinct
 from pydantic import BaseModel, Field
@@ -7,7 +6,7 @@ from email_validator import validate_email, EmailNotValidError
 import bcrypt
 from db.init_engine import get_db
 from db import db_models
-from utils import api_resp, error_resp
+from utils import error_response, success_response
 from utils import REGISTER_SUCCESS_RESPONSE, INVALID_EMAIL_REGISTER_RESPONSE, INVALID_USER_TYPE_REGISTER_RESPONSE, VALIDATION_ERROR_REGISTER_RESPONSES, INTERNAL_SERVER_ERROR_REGISTER_RESPONSE
 from utils import LOGIN_SUCCESS_RESPONSE, INVALID_EMAIL_RESPONSE, UNAUTHORIZED_RESPONSES, USER_NOT_FOUND_RESPONSE
 from middleware import create_access_token, get_current_user
@@ -48,14 +47,10 @@ def verify_password(plain_password: str, hashed_password: str):
     422: VALIDATION_ERROR_REGISTER_RESPONSES,
     500: INTERNAL_SERVER_ERROR_REGISTER_RESPONSE,
 })
-async def register(payload: user_register, db: Session = Depends(get_db)):
-    print("HELLOWORLD")
-    existing_user = db.query(db_models.User).filter(db_models.User.user_id == payload.user_id).first()
+def register(payload: user_register, db: Session = Depends(get_db)):
+    existing_user = db.query(db.query(db_models.User).filter(db_models.User.user_id == payload.user_id).exists()).scalar()
     if existing_user:
-        return JSONResponse(
-            content=api_resp(success=False, message="User already exists", error=error_resp(code=status.HTTP_422_UNPROCESSABLE_ENTITY)).dict(),
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        )
+        return error_response(status.HTTP_422_UNPROCESSABLE_ENTITY, "User already exists", error_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
     if payload.user_type == db_models.UserType.TEACHER:
         try:
@@ -63,21 +58,11 @@ async def register(payload: user_register, db: Session = Depends(get_db)):
             validated = validate_email(payload.user_id, check_deliverability=False)
             user_id = validated.email.lower()
         except EmailNotValidError as e:
-            return JSONResponse(
-                content=api_resp(success=False, message=f"Invalid email: {str(e)}", error=error_resp(code=status.HTTP_400_BAD_REQUEST)).dict(),
-                status_code=status.HTTP_400_BAD_REQUEST,
-            )
+            return error_response(status.HTTP_400_BAD_REQUEST, f"Invalid email: {str(e)}", error_code=status.HTTP_400_BAD_REQUEST, cache=False)
     else:
         user_id = payload.user_id.strip()
         if not user_id:
-            return JSONResponse(
-                content=api_resp(
-                    success=False,
-                    message="Username is required for student registration",
-                    error=error_resp(code=status.HTTP_422_UNPROCESSABLE_ENTITY)
-                ).model_dump(),
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
-            )
+            return error_response(status.HTTP_422_UNPROCESSABLE_ENTITY, "Username is required for student registration", error_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
     new_user = db_models.User(
@@ -92,16 +77,12 @@ async def register(payload: user_register, db: Session = Depends(get_db)):
     try:
         db.add(new_user)
         db.commit()
-        db.refresh(new_user)
     except Exception:
         db.rollback()
-        return JSONResponse(
-            content=api_resp(success=False, message="Failed to register", error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to register", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    return JSONResponse(
-        content=api_resp(success=True, message="Register successful", data=None).dict(),
+    return success_response(
+        message="Register successful",
         status_code=status.HTTP_201_CREATED,
     )
 
@@ -111,7 +92,7 @@ async def register(payload: user_register, db: Session = Depends(get_db)):
     401: UNAUTHORIZED_RESPONSES,
     404: USER_NOT_FOUND_RESPONSE,
 })
-async def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user_id = user.username
 
     db_user = db.query(db_models.User).filter(
@@ -119,24 +100,19 @@ async def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     ).first()
 
     if not db_user:
-        return JSONResponse(
-            content=api_resp(success=False, message="User does not exist", error=error_resp(code=status.HTTP_404_NOT_FOUND)).dict(),
-            status_code=status.HTTP_404_NOT_FOUND,
-        )
+        return error_response(status.HTTP_404_NOT_FOUND, "User does not exist", error_code=status.HTTP_404_NOT_FOUND)
 
     if not verify_password(user.password, db_user.password):
-        return JSONResponse(
-            content=api_resp(success=False, message="Incorrect password", error=error_resp(code=status.HTTP_401_UNAUTHORIZED)).dict(),
-            status_code=status.HTTP_401_UNAUTHORIZED,
-        )
+        return error_response(status.HTTP_401_UNAUTHORIZED, "Incorrect password", error_code=status.HTTP_401_UNAUTHORIZED)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user_id}, expires_delta=access_token_expires
     )
 
-    return JSONResponse(
-        content=api_resp(success=True, message="Login successful", data={"access_token": access_token, "token_type": "bearer"}).dict(),
+    return success_response(
+        message="Login successful",
+        data={"access_token": access_token, "token_type": "bearer"},
         status_code=status.HTTP_200_OK,
     )
 
@@ -151,7 +127,7 @@ async def read_profile(current_user: db_models.User = Depends(get_current_user))
     }
 
 @router.get("/schools", tags=["user"], status_code=status.HTTP_200_OK)
-async def get_schools(
+def get_schools(
     search: str = Query(None, description="Search term for school names"),
     limit: int = Query(10, description="Maximum number of schools to return"),
     db: Session = Depends(get_db)
@@ -179,22 +155,12 @@ async def get_schools(
         # Extract school names from tuples
         school_names = [school[0] for school in schools if school[0]]
         
-        return JSONResponse(
-            content=api_resp(
-                success=True,
-                message="Schools retrieved successfully",
-                data={"schools": school_names}
-            ).dict(),
+        return success_response(
+            message="Schools retrieved successfully",
+            data={"schools": school_names},
             status_code=status.HTTP_200_OK,
         )
         
     except Exception:
-        return JSONResponse(
-            content=api_resp(
-                success=False,
-                message="Failed to retrieve schools",
-                error=error_resp(code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ).dict(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve schools", error_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1,7 +1,12 @@
 import sys
 import os
+from contextlib import contextmanager
 import pytest
-from sqlalchemy import create_engine
+
+# Unexpected lazy relationship loads raise during tests (see utils.strict_load)
+os.environ.setdefault("STRICT_LOADING", "true")
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -22,7 +27,7 @@ engine = create_engine(
 )
 
 # Create session factory bound to this engine
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Create tables in test database
 Base.metadata.create_all(bind=engine)
@@ -59,3 +64,19 @@ def client():
     Provides a TestClient instance for API calls.
     """
     yield TestClient(app)
+
+@contextmanager
+def count_queries():
+    """
+    Collects the SQL statements executed against the test engine inside the block.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
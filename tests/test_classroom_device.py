@@ -0,0 +1,276 @@
+import pytest
+import uuid
+from tests.conftest import count_queries
+
+@pytest.fixture
+def teacher_headers(client):
+    unique_email = f"device.teacher.{uuid.uuid4().hex[:8]}@gmail.com"
+    payload = {
+        "user_id": unique_email,
+        "first_name": "Device",
+        "last_name": "Teacher",
+        "password": "MyCoolPassword##",
+        "user_type": "teacher"
+    }
+    reg_resp = client.post("/user/register", json=payload)
+    assert reg_resp.status_code == 201
+
+    login_resp = client.post("/user/login", data={
+        "username": payload["user_id"],
+        "password": payload["password"]
+    })
+    assert login_resp.status_code == 200
+    token = login_resp.json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def classroom_id(client, teacher_headers):
+    create_resp = client.post("/class/create", json={
+        "name": "device_class",
+        "subject": "Science",
+        "description": "Class for device tests"
+    }, headers=teacher_headers)
+    assert create_resp.status_code == 201
+    return create_resp.json()["data"]["id"]
+
+@pytest.fixture
+def device_id(client, teacher_headers, classroom_id):
+    add_resp = client.post(f"/classroom-device/classroom/{classroom_id}/add", json={
+        "device_name": "P-BIT-01",
+        "assignment_type": "public"
+    }, headers=teacher_headers)
+    assert add_resp.status_code == 201
+    return add_resp.json()["data"]["device_id"]
+
+def ble_batch(count=3):
+    return {
+        "readings": [
+            {
+                "timestamp": f"2025-01-01T10:00:0{i}",
+                "temperature": 21.5 + i,
+                "humidity": 40,
+                "battery_level": 90 - i
+            }
+            for i in range(count)
+        ]
+    }
+
+def test_record_ble_batch(client, teacher_headers, classroom_id, device_id):
+    """
+    Records a batch of readings for a registered device and reads them back.
+    """
+    headers = {**teacher_headers, "X-Device-Name": "P-BIT-01", "X-Classroom-ID": classroom_id}
+    record_resp = client.post("/classroom-device/record-ble-batch", json=ble_batch(), headers=headers)
+    assert record_resp.status_code == 201
+    body = record_resp.json()
+    assert body["data"]["recorded_count"] == 3
+    assert body["data"]["device_id"] == device_id
+
+    latest_resp = client.get(f"/classroom-device/{device_id}/data/latest", headers=teacher_headers)
+    assert latest_resp.status_code == 200
+    assert latest_resp.json()["data"]["data"]["temperature"] == 23.5
+
+def test_record_ble_batch_unknown_device(client, teacher_headers, classroom_id):
+    headers = {**teacher_headers, "X-Device-Name": "P-BIT-99", "X-Classroom-ID": classroom_id}
+    record_resp = client.post("/classroom-device/record-ble-batch", json=ble_batch(), headers=headers)
+    assert record_resp.status_code == 404
+    assert record_resp.json()["error_type"] == "device_not_found"
+
+def test_record_ble_batch_after_device_removed(client, teacher_headers, classroom_id, device_id):
+    """
+    Once a device is removed, the BLE ingest path no longer accepts readings for it.
+    """
+    headers = {**teacher_headers, "X-Device-Name": "P-BIT-01", "X-Classroom-ID": classroom_id}
+    assert client.post("/classroom-device/record-ble-batch", json=ble_batch(1), headers=headers).status_code == 201
+
+    delete_resp = client.delete(f"/classroom-device/{device_id}", headers=teacher_headers)
+    assert delete_resp.status_code == 200
+
+    record_resp = client.post("/classroom-device/record-ble-batch", json=ble_batch(1), headers=headers)
+    assert record_resp.status_code == 404
+
+def test_record_ble_batch_other_teacher_denied(client, classroom_id, device_id):
+    """
+    A teacher who does not own the classroom gets a 403, not a server error.
+    """
+    other_email = f"other.teacher.{uuid.uuid4().hex[:8]}@gmail.com"
+    client.post("/user/register", json={
+        "user_id": other_email,
+        "first_name": "Other",
+        "last_name": "Teacher",
+        "password": "MyCoolPassword##",
+        "user_type": "teacher"
+    })
+    login_resp = client.post("/user/login", data={"username": other_email, "password": "MyCoolPassword##"})
+    token = login_resp.json()["data"]["access_token"]
+
+    headers = {"Authorization": f"Bearer {token}", "X-Device-Name": "P-BIT-01", "X-Classroom-ID": classroom_id}
+    record_resp = client.post("/classroom-device/record-ble-batch", json=ble_batch(1), headers=headers)
+    assert record_resp.status_code == 403
+    assert record_resp.json()["error_type"] == "access_denied"
+
+def test_update_device_assignment(client, teacher_headers, classroom_id, device_id):
+    update_resp = client.put(f"/classroom-device/{device_id}/assignment", json={
+        "assignment_type": "unassigned"
+    }, headers=teacher_headers)
+    assert update_resp.status_code == 200
+    assert update_resp.json()["data"]["assignment_type"] == "unassigned"
+
+    devices_resp = client.get(f"/classroom-device/classroom/{classroom_id}/devices", headers=teacher_headers)
+    assert devices_resp.status_code == 200
+    devices = devices_resp.json()["data"]
+    assert [d["assignment"]["type"] for d in devices] == ["unassigned"]
+
+def test_classroom_devices_query_count(client, teacher_headers, classroom_id):
+    """
+    Listing classroom devices costs a fixed number of queries, however many devices there are.
+    """
+    for i in range(5):
+        add_resp = client.post(f"/classroom-device/classroom/{classroom_id}/add", json={
+            "device_name": f"P-BIT-1{i}",
+            "assignment_type": "public"
+        }, headers=teacher_headers)
+        assert add_resp.status_code == 201
+
+    with count_queries() as statements:
+        devices_resp = client.get(f"/classroom-device/classroom/{classroom_id}/devices", headers=teacher_headers)
+    assert devices_resp.status_code == 200
+    devices = devices_resp.json()["data"]
+    assert len(devices) == 5
+    assert {d["added_by"]["name"] for d in devices} == {"Device Teacher"}
+    assert len(statements) <= 4
+
+def test_classroom_devices_after_class_deleted(client, teacher_headers, classroom_id):
+    """
+    Device routes see a deleted class as missing right away.
+    """
+    assert client.get(f"/classroom-device/classroom/{classroom_id}/devices", headers=teacher_headers).status_code == 200
+
+    assert client.delete(f"/class/{classroom_id}", headers=teacher_headers).status_code == 200
+
+    devices_resp = client.get(f"/classroom-device/classroom/{classroom_id}/devices", headers=teacher_headers)
+    assert devices_resp.status_code == 404
+    assert devices_resp.json()["error_type"] == "classroom_not_found"
+
+def test_anonymous_credentials_follow_pin_change(client, teacher_headers, device_id):
+    """
+    A changed PIN or a removed student takes effect immediately.
+    """
+    class_resp = client.get("/class/owned", headers=teacher_headers)
+    passphrase = class_resp.json()["data"][0]["passphrase"]
+    join_resp = client.post("/class/join-anonymous", json={"passphrase": passphrase, "first_name": "Ada", "pin_code": "1234"})
+    assert join_resp.status_code == 200
+    class_id = join_resp.json()["data"]["class_id"]
+    student_id = join_resp.json()["data"]["student_id"]
+
+    credentials = {"class_id": class_id, "first_name": "Ada", "pin_code": "1234"}
+    assert client.get(f"/classroom-device/{device_id}/anonymous", params=credentials).status_code == 200
+    assert client.get(f"/classroom-device/{device_id}/anonymous", params=credentials).status_code == 200
+
+    pin_resp = client.put(f"/class/{class_id}/anonymous-student/{student_id}/pin", json={"pin_code": "5678"}, headers=teacher_headers)
+    assert pin_resp.status_code == 200
+
+    old_pin_resp = client.get(f"/classroom-device/{device_id}/anonymous", params=credentials)
+    assert old_pin_resp.status_code == 401
+    new_pin_resp = client.get(f"/classroom-device/{device_id}/anonymous", params={**credentials, "pin_code": "5678"})
+    assert new_pin_resp.status_code == 200
+
+    remove_resp = client.delete(f"/class/{class_id}/remove-anonymous-student/{student_id}", headers=teacher_headers)
+    assert remove_resp.status_code == 200
+    removed_resp = client.get(f"/classroom-device/{device_id}/anonymous", params={**credentials, "pin_code": "5678"})
+    assert removed_resp.status_code == 401
+
+def test_device_data_access_check(client, teacher_headers, classroom_id, device_id):
+    """
+    Reading device data checks device, classroom and membership in one query.
+    """
+    headers = {**teacher_headers, "X-Device-Name": "P-BIT-01", "X-Classroom-ID": classroom_id}
+    assert client.post("/classroom-device/record-ble-batch", json=ble_batch(2), headers=headers).status_code == 201
+
+    with count_queries() as statements:
+        data_resp = client.get(f"/classroom-device/{device_id}/data", headers=teacher_headers)
+    assert data_resp.status_code == 200
+    assert data_resp.json()["data"]["total_records"] == 2
+    # user lookup, access check, readings
+    assert len(statements) <= 3
+
+    other_email = f"outsider.{uuid.uuid4().hex[:8]}@gmail.com"
+    client.post("/user/register", json={
+        "user_id": other_email,
+        "first_name": "Out",
+        "last_name": "Sider",
+        "password": "MyCoolPassword##",
+        "user_type": "student"
+    })
+    token = client.post("/user/login", data={"username": other_email, "password": "MyCoolPassword##"}).json()["data"]["access_token"]
+    denied_resp = client.get(f"/classroom-device/{device_id}/data", headers={"Authorization": f"Bearer {token}"})
+    assert denied_resp.status_code == 403
+
+    missing_resp = client.get(f"/classroom-device/{uuid.uuid4()}/data", headers=teacher_headers)
+    assert missing_resp.status_code == 404
+    assert missing_resp.json()["error_type"] == "device_not_found"
+
+def test_anonymous_student_data_lists_public_devices(client, teacher_headers, device_id):
+    """
+    The anonymous student dashboard lists the classroom's public devices.
+    """
+    passphrase = client.get("/class/owned", headers=teacher_headers).json()["data"][0]["passphrase"]
+    join_resp = client.post("/class/join-anonymous", json={"passphrase": passphrase, "first_name": "Grace", "pin_code": "4321"})
+    class_id = join_resp.json()["data"]["class_id"]
+
+    data_resp = client.get(f"/class/{class_id}/anonymous-student-data", params={"first_name": "Grace", "pin_code": "4321"})
+    assert data_resp.status_code == 200
+    public_devices = data_resp.json()["data"]["public_devices"]
+    assert [(d["id"], d["device_name"]) for d in public_devices] == [(device_id, "P-BIT-01")]
+    assert data_resp.json()["data"]["assigned_devices"] == []
+
+def test_device_data_after_device_removed(client, teacher_headers, device_id):
+    """
+    Once a classroom device is removed, its data can no longer be read.
+    """
+    assert client.get(f"/classroom-device/{device_id}/data", headers=teacher_headers).status_code == 200
+    assert client.delete(f"/classroom-device/{device_id}", headers=teacher_headers).status_code == 200
+
+    data_resp = client.get(f"/classroom-device/{device_id}/data", headers=teacher_headers)
+    assert data_resp.status_code == 404
+    assert data_resp.json()["error_type"] == "device_not_found"
+
+def test_record_ble_batch_invalid_body(client, teacher_headers, classroom_id, device_id):
+    """
+    Batch bodies are validated straight from JSON; bad readings still get FastAPI's 422 with body locations.
+    """
+    headers = {**teacher_headers, "X-Device-Name": "P-BIT-01", "X-Classroom-ID": classroom_id}
+    bad_batch = ble_batch(2)
+    bad_batch["readings"][1]["humidity"] = 150
+    record_resp = client.post("/classroom-device/record-ble-batch", json=bad_batch, headers=headers)
+    assert record_resp.status_code == 422
+    assert record_resp.json()["detail"][0]["loc"] == ["body", "readings", 1, "humidity"]
+
+    garbled_resp = client.post("/classroom-device/record-ble-batch", content=b"{not json", headers=headers)
+    assert garbled_resp.status_code == 422
+
+    schema = client.get("/openapi.json").json()["paths"]["/classroom-device/record-ble-batch"]["post"]["requestBody"]
+    assert "readings" in schema["content"]["application/json"]["schema"]["properties"]
+
+def test_add_device_duplicate_name(client, teacher_headers, classroom_id, device_id):
+    """
+    A device name taken in the classroom is rejected by the unique constraint, without a pre-check query.
+    """
+    with count_queries() as statements:
+        dup_resp = client.post(f"/classroom-device/classroom/{classroom_id}/add", json={
+            "device_name": "P-BIT-01",
+            "assignment_type": "public"
+        }, headers=teacher_headers)
+    assert dup_resp.status_code == 409
+    assert dup_resp.json()["error_type"] == "device_already_exists"
+    assert not any("INSERT INTO classroom_device_assignments" in s for s in statements)
+
+    devices_resp = client.get(f"/classroom-device/classroom/{classroom_id}/devices", headers=teacher_headers)
+    assert [d["device_name"] for d in devices_resp.json()["data"]] == ["P-BIT-01"]
+
+    passphrase = client.get("/class/owned", headers=teacher_headers).json()["data"][0]["passphrase"]
+    join = {"passphrase": passphrase, "first_name": "Ada", "pin_code": "1234"}
+    assert client.post("/class/join-anonymous", json=join).status_code == 200
+    rejoin_resp = client.post("/class/join-anonymous", json={**join, "pin_code": "9999"})
+    assert rejoin_resp.status_code == 409
+    assert rejoin_resp.json()["error_type"] == "duplicate_name"
@@ -0,0 +1,541 @@
+import pytest
+import uuid
+from tests.conftest import count_queries
+
+@pytest.fixture
+def teacher_headers(client):
+    unique_email = f"bookmark.teacher.{uuid.uuid4().hex[:8]}@gmail.com"
+    payload = {
+        "user_id": unique_email,
+        "first_name": "Bookmark",
+        "last_name": "Teacher",
+        "password": "MyCoolPassword##",
+        "user_type": "teacher"
+    }
+    reg_resp = client.post("/user/register", json=payload)
+    assert reg_resp.status_code == 201
+
+    login_resp = client.post("/user/login", data={
+        "username": payload["user_id"],
+        "password": payload["password"]
+    })
+    assert login_resp.status_code == 200
+    token = login_resp.json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def random_mac():
+    return ":".join(uuid.uuid4().hex[i:i + 2] for i in range(0, 12, 2)).upper()
+
+def test_user_devices_lists_bookmarks_with_classrooms(client, teacher_headers):
+    """
+    Bookmarked devices are listed with the classrooms they are assigned to.
+    """
+    class_resp = client.post("/class/create", json={
+        "name": "bookmark_class",
+        "subject": "Science",
+        "description": "Class for bookmark tests"
+    }, headers=teacher_headers)
+    assert class_resp.status_code == 201
+    classroom_id = class_resp.json()["data"]["id"]
+
+    first = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers)
+    second = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench B"}, headers=teacher_headers)
+    assert first.status_code == 201
+    assert second.status_code == 201
+    first_id = first.json()["data"]["id"]
+
+    assign_resp = client.post(f"/device/{first_id}/assign", json={
+        "classroom_id": classroom_id,
+        "assignment_type": "public"
+    }, headers=teacher_headers)
+    assert assign_resp.status_code == 200
+    assert assign_resp.json()["data"]["classroom_id"] == classroom_id
+    assert assign_resp.json()["data"]["created_at"] is not None
+
+    duplicate_resp = client.post(f"/device/{first_id}/assign", json={
+        "classroom_id": classroom_id,
+        "assignment_type": "public"
+    }, headers=teacher_headers)
+    assert duplicate_resp.status_code == 409
+    assert duplicate_resp.json()["error_type"] == "duplicate_assignment"
+
+    list_resp = client.get("/device/user-devices", headers=teacher_headers)
+    assert list_resp.status_code == 200
+    devices = {d["nickname"]: d for d in list_resp.json()["data"]}
+    assert set(devices) == {"Bench A", "Bench B"}
+    assert [c["classroom_id"] for c in devices["Bench A"]["classrooms"]] == [classroom_id]
+    assert devices["Bench A"]["classrooms"][0]["classroom_name"] == "bookmark_class"
+    assert devices["Bench B"]["classrooms"] == []
+
+def test_user_devices_query_count(client, teacher_headers):
+    """
+    Listing bookmarked devices costs a fixed number of queries, however many devices there are.
+    """
+    class_resp = client.post("/class/create", json={
+        "name": "query_count_class",
+        "subject": "Science",
+        "description": "Class for query count tests"
+    }, headers=teacher_headers)
+    classroom_id = class_resp.json()["data"]["id"]
+
+    for i in range(5):
+        register_resp = client.post("/device/register", json={"mac_address": random_mac(), "nickname": f"Bench {i}"}, headers=teacher_headers)
+        assert register_resp.status_code == 201
+        assign_resp = client.post(f"/device/{register_resp.json()['data']['id']}/assign", json={
+            "classroom_id": classroom_id,
+            "assignment_type": "public"
+        }, headers=teacher_headers)
+        assert assign_resp.status_code == 200
+
+    with count_queries() as statements:
+        list_resp = client.get("/device/user-devices", headers=teacher_headers)
+    assert list_resp.status_code == 200
+    assert len(list_resp.json()["data"]) == 5
+    assert len(statements) <= 3
+
+def test_classroom_devices_single_query(client, teacher_headers):
+    """
+    Assigned devices are listed with the teacher's nicknames from one query.
+    """
+    class_resp = client.post("/class/create", json={
+        "name": "listing_class",
+        "subject": "Science",
+        "description": "Class for listing tests"
+    }, headers=teacher_headers)
+    classroom_id = class_resp.json()["data"]["id"]
+
+    for i in range(3):
+        register_resp = client.post("/device/register", json={"mac_address": random_mac(), "nickname": f"Bench {i}"}, headers=teacher_headers)
+        assert register_resp.status_code == 201
+        assign_resp = client.post(f"/device/{register_resp.json()['data']['id']}/assign", json={
+            "classroom_id": classroom_id,
+            "assignment_type": "public"
+        }, headers=teacher_headers)
+        assert assign_resp.status_code == 200
+
+    with count_queries() as statements:
+        list_resp = client.get(f"/device/classroom/{classroom_id}/devices", headers=teacher_headers)
+    assert list_resp.status_code == 200
+    assignments = list_resp.json()["data"]
+    assert sorted(a["device"]["nickname"] for a in assignments) == ["Bench 0", "Bench 1", "Bench 2"]
+    assert {a["classroom_id"] for a in assignments} == {classroom_id}
+    assert len(statements) <= 3
+
+def test_assign_device_checks(client, teacher_headers):
+    """
+    Each failed precondition of an assignment maps to its own error.
+    """
+    device_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+
+    unknown_device = client.post("/device/not-a-device/assign", json={
+        "classroom_id": "not-a-class",
+        "assignment_type": "public"
+    }, headers=teacher_headers)
+    assert unknown_device.status_code == 404
+    assert unknown_device.json()["error_type"] == "device_not_found"
+
+    unknown_class = client.post(f"/device/{device_id}/assign", json={
+        "classroom_id": "not-a-class",
+        "assignment_type": "public"
+    }, headers=teacher_headers)
+    assert unknown_class.status_code == 404
+    assert unknown_class.json()["error_type"] == "classroom_not_found"
+
+    assert client.get(f"/device/{device_id}/data/latest", headers=teacher_headers).status_code == 200
+    assert client.get("/device/not-a-device/data/latest", headers=teacher_headers).status_code == 404
+
+def test_register_device_conflicts(client, teacher_headers):
+    """
+    Re-registering a bookmarked device returns the bookmark; reusing a nickname is a conflict.
+    """
+    mac = random_mac()
+    first = client.post("/device/register", json={"mac_address": mac, "nickname": "Bench A"}, headers=teacher_headers)
+    assert first.status_code == 201
+    assert first.json()["data"]["mac_address"] == mac
+    assert first.json()["data"]["created_at"] is not None
+
+    again = client.post("/device/register", json={"mac_address": mac.lower(), "nickname": "Bench C"}, headers=teacher_headers)
+    assert again.status_code == 200
+    assert again.json()["data"]["id"] == first.json()["data"]["id"]
+    assert again.json()["data"]["nickname"] == "Bench A"
+
+    taken = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers)
+    assert taken.status_code == 409
+    assert taken.json()["error_type"] == "duplicate_nickname"
+
+def test_device_by_mac_reflects_uploads(client, teacher_headers):
+    """
+    Device lookups are cached, but an upload from the device must show up in the next lookup.
+    """
+    mac = random_mac()
+    register_resp = client.post("/device/register", json={"mac_address": mac, "nickname": "Bench A"}, headers=teacher_headers)
+    assert register_resp.status_code == 201
+    device_id = register_resp.json()["data"]["id"]
+    assert client.get(f"/device/{device_id}", headers=teacher_headers).json()["data"]["is_active"] is False
+
+    lookup_resp = client.get(f"/device/mac/{mac.lower()}")
+    assert lookup_resp.status_code == 200
+    assert lookup_resp.json()["data"]["is_active"] is False
+    assert client.get(f"/device/mac/{mac}").json()["data"] == lookup_resp.json()["data"]
+
+    upload_resp = client.post(f"/device/mac/{mac}/upload", json={"temperature": 21.0, "battery_level": 77})
+    assert upload_resp.status_code == 200
+
+    lookup_resp = client.get(f"/device/mac/{mac}")
+    assert lookup_resp.json()["data"]["is_active"] is True
+    assert lookup_resp.json()["data"]["battery_level"] == 77
+
+    device_resp = client.get(f"/device/{device_id}", headers=teacher_headers)
+    assert device_resp.json()["data"]["battery_level"] == 77
+    assert device_resp.json()["data"]["nickname"] == "Bench A"
+
+def test_unassign_and_remove_bookmark(client, teacher_headers):
+    """
+    A bookmark cannot be removed while the device is assigned to one of the user's classrooms.
+    """
+    class_resp = client.post("/class/create", json={
+        "name": "unassign_class",
+        "subject": "Science",
+        "description": "Class for unassign tests"
+    }, headers=teacher_headers)
+    classroom_id = class_resp.json()["data"]["id"]
+
+    register_resp = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers)
+    device_id = register_resp.json()["data"]["id"]
+
+    missing_resp = client.delete(f"/device/{device_id}/unassign", params={"classroom_id": classroom_id}, headers=teacher_headers)
+    assert missing_resp.status_code == 404
+    assert missing_resp.json()["error_type"] == "assignment_not_found"
+
+    assert client.post(f"/device/{device_id}/assign", json={
+        "classroom_id": classroom_id,
+        "assignment_type": "public"
+    }, headers=teacher_headers).status_code == 200
+
+    blocked_resp = client.delete(f"/device/{device_id}", headers=teacher_headers)
+    assert blocked_resp.status_code == 400
+    assert blocked_resp.json()["error_type"] == "device_has_assignments"
+
+    unassign_resp = client.delete(f"/device/{device_id}/unassign", params={"classroom_id": classroom_id}, headers=teacher_headers)
+    assert unassign_resp.status_code == 200
+
+    assert client.delete(f"/device/{device_id}", headers=teacher_headers).status_code == 200
+    assert client.get("/device/user-devices", headers=teacher_headers).json()["data"] == []
+
+def test_remove_bookmark_unknown_device(client, teacher_headers):
+    delete_resp = client.delete(f"/device/{uuid.uuid4()}", headers=teacher_headers)
+    assert delete_resp.status_code == 404
+    assert delete_resp.json()["error_type"] == "device_not_found"
+
+    unassign_resp = client.delete(f"/device/{uuid.uuid4()}/unassign", params={"classroom_id": "missing"}, headers=teacher_headers)
+    assert unassign_resp.status_code == 404
+    assert unassign_resp.json()["error_type"] == "device_not_found"
+
+def test_get_device_returns_bookmark_nickname(client, teacher_headers):
+    register_resp = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers)
+    device_id = register_resp.json()["data"]["id"]
+
+    get_resp = client.get(f"/device/{device_id}", headers=teacher_headers)
+    assert get_resp.status_code == 200
+    assert get_resp.json()["data"]["nickname"] == "Bench A"
+
+    latest_resp = client.get(f"/device/{device_id}/data/latest", headers=teacher_headers)
+    assert latest_resp.status_code == 200
+
+    assert client.get(f"/device/{uuid.uuid4()}/data/latest", headers=teacher_headers).status_code == 404
+
+def test_get_device_through_classroom_membership(client, teacher_headers):
+    """
+    A student can read a device assigned to a class they joined; nobody else can.
+    """
+    class_resp = client.post("/class/create", json={
+        "name": "member_class",
+        "subject": "Science",
+        "description": "Class for membership tests"
+    }, headers=teacher_headers)
+    passphrase = class_resp.json()["data"]["passphrase"]
+    classroom_id = class_resp.json()["data"]["id"]
+
+    device_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+    assert client.post(f"/device/{device_id}/assign", json={"classroom_id": classroom_id, "assignment_type": "public"}, headers=teacher_headers).status_code == 200
+
+    student_headers = {}
+    for name in ("member", "outsider"):
+        username = f"{name}{uuid.uuid4().hex[:8]}"
+        client.post("/user/register", json={
+            "user_id": username,
+            "first_name": name.title(),
+            "last_name": "Student",
+            "password": "MyCoolPassword##",
+            "user_type": "student"
+        })
+        login_resp = client.post("/user/login", data={"username": username, "password": "MyCoolPassword##"})
+        student_headers[name] = {"Authorization": f"Bearer {login_resp.json()['data']['access_token']}"}
+    assert client.post("/class/join", json={"passphrase": passphrase}, headers=student_headers["member"]).status_code == 200
+
+    member_resp = client.get(f"/device/{device_id}", headers=student_headers["member"])
+    assert member_resp.status_code == 200
+    assert member_resp.json()["data"]["nickname"] is None
+
+    assert client.get(f"/device/{device_id}", headers=student_headers["outsider"]).status_code == 403
+
+    # Leaving the class revokes data access right away
+    for _ in range(2):
+        assert client.get(f"/device/{device_id}/data/latest", headers=student_headers["member"]).status_code == 200
+    assert client.get(f"/device/{device_id}/data/latest", headers=student_headers["outsider"]).status_code == 403
+    assert client.delete(f"/class/{classroom_id}/leave", headers=student_headers["member"]).status_code == 200
+    assert client.get(f"/device/{device_id}/data/latest", headers=student_headers["member"]).status_code == 403
+
+def test_register_devices_bulk(client, teacher_headers):
+    """
+    Bulk registration reports a result per item and applies the single-register rules.
+    """
+    existing_mac = random_mac()
+    assert client.post("/device/register", json={"mac_address": existing_mac, "nickname": "Bench A"}, headers=teacher_headers).status_code == 201
+
+    new_mac = random_mac()
+    bulk_resp = client.post("/device/register-bulk", json={"devices": [
+        {"mac_address": new_mac, "nickname": "Bench B"},
+        {"mac_address": existing_mac, "nickname": "Bench C"},
+        {"mac_address": random_mac(), "nickname": "Bench A"},
+        {"mac_address": "ZZ:BB:CC:DD:EE:FF", "nickname": "Bench D"},
+        {"mac_address": new_mac.replace(":", "-"), "nickname": "Bench E"}
+    ]}, headers=teacher_headers)
+    assert bulk_resp.status_code == 201
+    data = bulk_resp.json()["data"]
+    assert data["bookmarked_count"] == 1
+    assert [r["success"] for r in data["results"]] == [True, True, False, False, True]
+    assert data["results"][1]["nickname"] == "Bench A"
+    assert data["results"][2]["error_type"] == "duplicate_nickname"
+    assert data["results"][3]["error_type"] == "validation_error"
+    assert data["results"][4]["id"] == data["results"][0]["id"]
+
+    list_resp = client.get("/device/user-devices", headers=teacher_headers)
+    assert sorted(d["nickname"] for d in list_resp.json()["data"]) == ["Bench A", "Bench B"]
+
+def test_update_device_assignment(client, teacher_headers):
+    class_resp = client.post("/class/create", json={
+        "name": "update_class",
+        "subject": "Science",
+        "description": "Class for assignment updates"
+    }, headers=teacher_headers)
+    classroom_id = class_resp.json()["data"]["id"]
+
+    register_resp = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers)
+    device_id = register_resp.json()["data"]["id"]
+
+    update = {"classroom_id": classroom_id, "assignment_type": "group", "assignment_id": "group-1"}
+    missing_resp = client.put(f"/device/{device_id}/assignment", json=update, headers=teacher_headers)
+    assert missing_resp.status_code == 404
+    assert missing_resp.json()["error_type"] == "assignment_not_found"
+
+    assert client.post(f"/device/{device_id}/assign", json={
+        "classroom_id": classroom_id,
+        "assignment_type": "public"
+    }, headers=teacher_headers).status_code == 200
+
+    update_resp = client.put(f"/device/{device_id}/assignment", json=update, headers=teacher_headers)
+    assert update_resp.status_code == 200
+
+    list_resp = client.get("/device/user-devices", headers=teacher_headers)
+    classrooms = list_resp.json()["data"][0]["classrooms"]
+    assert [(c["assignment_type"], c["assignment_id"]) for c in classrooms] == [("group", "group-1")]
+
+    other_resp = client.put(f"/device/{uuid.uuid4()}/assignment", json=update, headers=teacher_headers)
+    assert other_resp.status_code == 404
+    assert other_resp.json()["error_type"] == "device_not_found"
+
+def test_add_device_data_batch(client, teacher_headers):
+    """
+    A batch of readings for several devices is stored in one request.
+    """
+    first_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+    second_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench B"}, headers=teacher_headers).json()["data"]["id"]
+
+    batch_resp = client.post("/device/data/batch", json={"readings": [
+        {"device_id": first_id, "timestamp": "2025-01-01T10:00:00", "temperature": 20.0},
+        {"device_id": first_id, "timestamp": "2025-01-01T10:00:05", "temperature": 21.0},
+        {"device_id": second_id, "timestamp": "2025-01-01T10:00:00", "humidity": 45.0}
+    ]})
+    assert batch_resp.status_code == 201
+    assert batch_resp.json()["data"]["recorded_count"] == 3
+
+    latest_resp = client.get(f"/device/{first_id}/data/latest", headers=teacher_headers)
+    assert latest_resp.json()["data"]["data"]["temperature"] == 21.0
+    assert client.get(f"/device/{first_id}", headers=teacher_headers).json()["data"]["last_seen"].startswith("2025-01-01T10:00:05")
+
+    unknown_resp = client.post("/device/data/batch", json={"readings": [
+        {"device_id": first_id, "temperature": 20.0},
+        {"device_id": "not-a-device", "temperature": 20.0}
+    ]})
+    assert unknown_resp.status_code == 404
+    assert unknown_resp.json()["error_type"] == "device_not_found"
+
+def test_add_device_data_batch_mixed_timezones(client, teacher_headers):
+    """
+    Readings without a timestamp can share a batch with timezone-aware ones; all are stored as naive UTC.
+    """
+    device_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+
+    batch_resp = client.post("/device/data/batch", json={"readings": [
+        {"device_id": device_id, "temperature": 20.0},
+        {"device_id": device_id, "timestamp": "2099-01-01T02:00:00+02:00", "temperature": 21.0}
+    ]})
+    assert batch_resp.status_code == 201
+    assert client.get(f"/device/{device_id}", headers=teacher_headers).json()["data"]["last_seen"].startswith("2099-01-01T00:00:00")
+
+def test_upload_buffered_readings_by_mac(client, teacher_headers):
+    """
+    A device flushing buffered readings uploads them in one request; its status follows the newest reading.
+    """
+    mac = random_mac()
+    device_id = client.post("/device/register", json={"mac_address": mac, "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+
+    upload_resp = client.post(f"/device/mac/{mac.lower()}/upload-batch", json={"readings": [
+        {"timestamp": "2025-01-01T10:00:05", "temperature": 21.0, "battery_level": 80},
+        {"timestamp": "2025-01-01T10:00:00", "temperature": 20.0, "battery_level": 90},
+        {"timestamp": "2025-01-01T10:00:10", "humidity": 45.0}
+    ]})
+    assert upload_resp.status_code == 200
+    assert upload_resp.json()["data"]["recorded_count"] == 3
+
+    device = client.get(f"/device/{device_id}", headers=teacher_headers).json()["data"]
+    assert device["is_active"] is True
+    assert device["battery_level"] == 80
+    # last_seen is the upload time, not the newest buffered reading
+    assert not device["last_seen"].startswith("2025-01-01")
+
+    history_resp = client.get(f"/device/{device_id}/data", headers=teacher_headers)
+    assert history_resp.json()["data"]["total_records"] == 3
+
+    unknown_resp = client.post(f"/device/mac/{random_mac()}/upload-batch", json={"readings": [{"temperature": 20.0}]})
+    assert unknown_resp.status_code == 404
+    assert unknown_resp.json()["error_type"] == "device_not_found"
+
+def test_upload_buffered_readings_mixed_timezones(client, teacher_headers):
+    """
+    Buffered readings without a timestamp can share a batch with timezone-aware ones.
+    """
+    mac = random_mac()
+    device_id = client.post("/device/register", json={"mac_address": mac, "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+
+    upload_resp = client.post(f"/device/mac/{mac}/upload-batch", json={"readings": [
+        {"timestamp": "2025-01-01T02:00:00+02:00", "temperature": 21.0, "battery_level": 80},
+        {"temperature": 20.0, "battery_level": 90}
+    ]})
+    assert upload_resp.status_code == 200
+    assert client.get(f"/device/{device_id}", headers=teacher_headers).json()["data"]["battery_level"] == 90
+
+    history = client.get(f"/device/{device_id}/data", headers=teacher_headers).json()["data"]["data"]
+    assert history[-1]["timestamp"].startswith("2025-01-01T00:00:00")
+
+    future_resp = client.post(f"/device/mac/{mac}/upload-batch", json={"readings": [{"timestamp": "2099-01-01T00:00:00Z", "temperature": 21.0}]})
+    assert future_resp.status_code == 400
+    assert future_resp.json()["error_type"] == "validation_error"
+
+def test_device_data_by_mac(client, teacher_headers):
+    """
+    The by-MAC history returns sensor values as floats, keeping zero readings.
+    """
+    mac = random_mac()
+    client.post("/device/register", json={"mac_address": mac, "nickname": "Bench A"}, headers=teacher_headers)
+    assert client.post(f"/device/mac/{mac}/upload", json={"temperature": 0.0, "humidity": 45}).status_code == 200
+
+    data = client.get(f"/device/mac/{mac}/data").json()["data"]
+    assert data["current_readings"]["temperature"] == 0.0
+    assert data["current_readings"]["humidity"] == 45.0
+    assert data["current_readings"]["light"] is None
+    assert len(data["sensor_data"]) == 1
+
+def test_add_device_data(client, teacher_headers):
+    """
+    A single reading is stored and echoed back without re-reading the inserted row.
+    """
+    device_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+
+    with count_queries() as statements:
+        add_resp = client.post("/device/data", json={"device_id": device_id, "timestamp": "2025-01-01T10:00:00", "temperature": 20.5})
+    assert add_resp.status_code == 201
+    assert add_resp.json()["data"]["temperature"] == 20.5
+    assert add_resp.json()["data"]["timestamp"] == "2025-01-01T10:00:00"
+    # device lookup, insert, last_seen update
+    assert len(statements) <= 3
+
+    # A zero reading is a value, not a missing one
+    zero_resp = client.post("/device/data", json={"device_id": device_id, "timestamp": "2025-01-01T09:00:00", "temperature": 0.0})
+    assert zero_resp.json()["data"]["temperature"] == 0.0
+
+    # The latest reading is cached, but the next upload replaces it
+    assert client.get(f"/device/{device_id}/data/latest", headers=teacher_headers).json()["data"]["data"]["temperature"] == 20.5
+    client.post("/device/data", json={"device_id": device_id, "timestamp": "2025-01-01T10:00:05", "temperature": 22.0})
+    assert client.get(f"/device/{device_id}/data/latest", headers=teacher_headers).json()["data"]["data"]["temperature"] == 22.0
+
+def test_device_data_keyset_pages(client, teacher_headers):
+    """
+    History pages follow next_cursor without skipping readings that share a timestamp.
+    """
+    device_id = client.post("/device/register", json={"mac_address": random_mac(), "nickname": "Bench A"}, headers=teacher_headers).json()["data"]["id"]
+    readings = [{"device_id": device_id, "timestamp": f"2025-01-01T10:00:0{i // 2}", "temperature": 20.0 + i} for i in range(5)]
+    assert client.post("/device/data/batch", json={"readings": readings}).status_code == 201
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        page = client.get(f"/device/{device_id}/data", params=params, headers=teacher_headers).json()["data"]
+        seen.extend(reading["temperature"] for reading in page["data"])
+        if page["next_cursor"] is None:
+            break
+        params = {"limit": 2, **page["next_cursor"]}
+    assert sorted(seen) == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+    orphan_resp = client.get(f"/device/{device_id}/data", params={"before_id": "x"}, headers=teacher_headers)
+    assert orphan_resp.status_code == 400
+
+def test_register_ble_device(client, teacher_headers):
+    """
+    Registering a BLE device writes the device and bookmark without reading anything back.
+    """
+    with count_queries() as statements:
+        register_resp = client.post("/device/register-ble", json={"nickname": "Bench BLE"}, headers=teacher_headers)
+    assert register_resp.status_code == 201
+    data = register_resp.json()["data"]
+    assert data["mac_address"].startswith("BLE:")
+    assert data["created_at"] is not None
+    # user lookup, device insert, bookmark insert
+    assert len(statements) <= 3
+
+    list_resp = client.get("/device/user-devices", headers=teacher_headers)
+    assert [d["id"] for d in list_resp.json()["data"]] == [data["device_id"]]
+
+def test_register_ble_device_anonymous_without_mac(client, teacher_headers):
+    """
+    Anonymous BLE registrations without a MAC address each get their own placeholder.
+    """
+    classroom = client.post("/class/create", json={"name": "ble_class", "subject": "Science"}, headers=teacher_headers).json()["data"]
+    join = client.post("/class/join-anonymous", json={"passphrase": classroom["passphrase"], "first_name": "Ada", "pin_code": "1234"}).json()["data"]
+    credentials = {"class_id": join["class_id"], "first_name": "Ada", "pin_code": "1234"}
+
+    macs = []
+    for nickname in ("Bench A", "Bench B"):
+        register_resp = client.post("/device/register-ble-anonymous", params=credentials, json={"nickname": nickname})
+        assert register_resp.status_code == 201
+        macs.append(register_resp.json()["data"]["mac_address"])
+    assert all(mac.startswith("BLE:") for mac in macs)
+    assert macs[0] != macs[1]
+
+def test_register_ble_device_normalizes_mac(client, teacher_headers):
+    """
+    A supplied BLE MAC address is stored in the normalized form the lookups use.
+    """
+    mac = random_mac()
+    register_resp = client.post("/device/register-ble", json={"nickname": "Bench BLE", "mac_address": mac.lower().replace(":", "-")}, headers=teacher_headers)
+    assert register_resp.status_code == 201
+    assert register_resp.json()["data"]["mac_address"] == mac
+    assert client.get(f"/device/mac/{mac}/data").status_code == 200
+
+    duplicate_resp = client.post("/device/register-ble", json={"nickname": "Bench BLE 2", "mac_address": mac}, headers=teacher_headers)
+    assert duplicate_resp.status_code == 409
+    assert duplicate_resp.json()["error_type"] == "duplicate_device"
+
+    invalid_resp = client.post("/device/register-ble", json={"nickname": "Bench BLE 3", "mac_address": "not-a-mac"}, headers=teacher_headers)
+    assert invalid_resp.status_code == 400
@@ -0,0 +1,75 @@
+import pytest
+import uuid
+from tests.conftest import count_queries
+
+@pytest.fixture
+def teacher_headers(client):
+    unique_email = f"group.teacher.{uuid.uuid4().hex[:8]}@gmail.com"
+    payload = {
+        "user_id": unique_email,
+        "first_name": "Group",
+        "last_name": "Teacher",
+        "password": "MyCoolPassword##",
+        "user_type": "teacher"
+    }
+    assert client.post("/user/register", json=payload).status_code == 201
+
+    login_resp = client.post("/user/login", data={
+        "username": payload["user_id"],
+        "password": payload["password"]
+    })
+    assert login_resp.status_code == 200
+    token = login_resp.json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def classroom(client, teacher_headers):
+    create_resp = client.post("/class/create", json={
+        "name": "group_class",
+        "subject": "Science",
+        "description": "Class for group tests"
+    }, headers=teacher_headers)
+    assert create_resp.status_code == 201
+    return create_resp.json()["data"]
+
+def test_random_distribute_and_list_students(client, teacher_headers, classroom):
+    """
+    Students are distributed over the groups, and the student and group lists report
+    the assignments with a fixed number of queries however many students there are.
+    """
+    classroom_id = classroom["id"]
+    for name in ("Red", "Blue"):
+        group_resp = client.post(f"/classroom/{classroom_id}/groups", json={"name": name, "icon": "*"}, headers=teacher_headers)
+        assert group_resp.status_code == 201
+
+    for i in range(4):
+        join_resp = client.post("/class/join-anonymous", json={
+            "passphrase": classroom["passphrase"],
+            "first_name": f"Student{chr(65 + i)}",
+            "pin_code": "1234"
+        })
+        assert join_resp.status_code == 200
+
+    with count_queries() as statements:
+        distribute_resp = client.post(f"/classroom/{classroom_id}/groups/random-distribute", headers=teacher_headers)
+    assert distribute_resp.status_code == 200
+    assert distribute_resp.json()["data"]["distributed_count"] == 4
+    # user lookup, classroom, groups, registered students, anonymous students, memberships, insert
+    assert len(statements) <= 7
+
+    with count_queries() as statements:
+        students_resp = client.get(f"/classroom/{classroom_id}/students", headers=teacher_headers)
+    assert students_resp.status_code == 200
+    students = students_resp.json()["data"]
+    assert len(students) == 4
+    assert {s["group_name"] for s in students} == {"Red", "Blue"}
+    assert len(statements) <= 6
+
+    groups_resp = client.get(f"/classroom/{classroom_id}/groups", headers=teacher_headers)
+    assert groups_resp.status_code == 200
+    assert sorted(g["student_count"] for g in groups_resp.json()["data"]) == [2, 2]
+
+    # Everyone is assigned now
+    again_resp = client.post(f"/classroom/{classroom_id}/groups/random-distribute", headers=teacher_headers)
+    assert again_resp.status_code == 400
+    assert again_resp.json()["error_type"] == "no_unassigned_students"
@@ -1,5 +1,6 @@
 import pytest
 import uuid
+from tests.conftest import count_queries
 
 @pytest.fixture
 def teacher_payload():
@@ -279,9 +280,11 @@ def test_get_owned_classes(client, teacher_payload, class_payload):
         assert create_resp.status_code == 201
         created_classes.append(create_resp.json()["data"])
 
-    # Step 3: Retrieve owned classes
-    owned_resp = client.get("/class/owned", headers=headers)
+    # Step 3: Retrieve owned classes (user lookup plus one query, however many classes)
+    with count_queries() as statements:
+        owned_resp = client.get("/class/owned", headers=headers)
     assert owned_resp.status_code == 200
+    assert len(statements) <= 2
 
     owned_data = owned_resp.json()["data"]
     assert isinstance(owned_data, list)
@@ -353,9 +356,11 @@ def test_get_enrolled_classes(client, teacher_payload, student_payload, class_pa
     join_resp = client.post("/class/join", json=join_payload, headers=student_headers)
     assert join_resp.status_code == 200
 
-    # Step 5: Get enrolled classes
-    enrolled_resp = client.get("/class/enrolled", headers=student_headers)
+    # Step 5: Get enrolled classes (user lookup plus one query, however many classes)
+    with count_queries() as statements:
+        enrolled_resp = client.get("/class/enrolled", headers=student_headers)
     assert enrolled_resp.status_code == 200
+    assert len(statements) <= 2
 
     data = enrolled_resp.json()["data"]
     assert isinstance(data, list)
@@ -379,6 +384,9 @@ def test_get_enrolled_classes(client, teacher_payload, student_payload, class_pa
             assert cls["name"] == unique_class["name"]
             assert cls["subject"] == class_payload["subject"]
             assert cls["description"] == class_payload["description"]
+            assert cls["owner_name"] == f"{teacher_payload['first_name']} {teacher_payload['last_name']}"
+            assert cls["member_count"] == 1
+            assert cls["joined_at"] is not None
 
     assert found, "Created class not found in enrolled list"
 
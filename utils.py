@@ -1,5 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import Optional, Any
+from decimal import Decimal
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from functools import lru_cache
+import logging
+import os
+import re
+import time
+from fastapi import Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Float, Numeric, type_coerce
+from sqlalchemy.orm import Session, raiseload
+from constants import STRICT_LOADING
+import orjson
 
 class error_resp(BaseModel):
     code: int
@@ -13,6 +29,186 @@ class api_resp(BaseModel):
     error_type: Optional[str] = None
 
 
+logger = logging.getLogger(__name__)
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Numeric sensor columns come back from the database as Decimal
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def uuid7() -> str:
+    """
+    Time-ordered UUID (RFC 9562 version 7) as a 36-character string.
+    Primary keys generated close together sort next to each other, so inserts append to
+    the right-hand side of the index instead of landing on random pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76                             # version
+        | (rand >> 68) << 64                    # rand_a (12 bits)
+        | 0b10 << 62                            # variant
+        | (rand & 0x3FFFFFFFFFFFFFFF)           # rand_b (62 bits)
+    )
+    # Formatted directly rather than through uuid.UUID, which validates and builds an object per id
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+class TransactionError(Exception):
+    """Raised by db_txn when a commit fails; rendered as an api_resp envelope by the app's exception handler."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+@contextmanager
+def db_txn(db: Session, error_message: str):
+    """
+    Commit the work done in the block, or roll it back and raise TransactionError.
+    Constraint violations map to 409, anything else to 500.
+    """
+    try:
+        yield
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning("%s: %s", error_message, e.orig)
+        raise TransactionError(f"{error_message}: {str(e.orig)}", status.HTTP_409_CONFLICT)
+    except Exception as e:
+        db.rollback()
+        logger.exception(error_message)
+        raise TransactionError(f"{error_message}: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, which is much faster than the stdlib encoder
+    and serializes datetime/UUID values natively."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def _error_envelope(message: str, error_type: Optional[str], error_code: Optional[int]) -> dict:
+    """Same fields as api_resp(success=False, ...).model_dump(), without the model round trip."""
+    return {
+        "success": False,
+        "message": message,
+        "data": None,
+        "error": {"code": error_code, "details": None} if error_code is not None else None,
+        "error_type": error_type,
+    }
+
+@lru_cache(maxsize=512)
+def _error_body(message: str, error_type: Optional[str], error_code: Optional[int]) -> bytes:
+    return orjson.dumps(_error_envelope(message, error_type, error_code))
+
+def error_response(
+    status_code: int,
+    message: str,
+    error_type: Optional[str] = None,
+    error_code: Optional[int] = None,
+    cache: bool = True,
+) -> Response:
+    """
+    Failure envelope. For a fixed message the serialized body is built once per
+    (message, error_type, error_code) and reused; only the Response object is per request.
+    Pass cache=False for messages that embed per-request details such as an exception.
+    """
+    body = _error_body(message, error_type, error_code) if cache else orjson.dumps(_error_envelope(message, error_type, error_code))
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+def success_response(message: str, data: Any = None, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    """
+    Success envelope with the same fields as api_resp, built as a plain dict so the
+    payload goes straight to orjson instead of being copied through model_dump() first.
+    """
+    return ORJSONResponse(
+        content={"success": True, "message": message, "data": data, "error": None, "error_type": None},
+        status_code=status_code,
+    )
+
+def json_body(model: type[BaseModel]):
+    """
+    Request body dependency for the batch ingest endpoints. The raw bytes are validated with
+    model_validate_json in one pass, instead of json.loads followed by validating the resulting
+    dicts, which roughly halves parsing time for a full batch. Invalid bodies get FastAPI's usual 422.
+    """
+    async def parse_body(request: Request):
+        body = await request.body()
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+                body=body,
+            )
+    return parse_body
+
+def json_body_docs(model: type[BaseModel]) -> dict:
+    """openapi_extra documenting a json_body() request body, with the nested models inlined."""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": inline(schema)}}}}
+
+def reading_columns(model) -> tuple:
+    """
+    All columns of a sensor reading table for a plain-column select. Numeric sensor
+    values are coerced to Float on the way out, so rows carry float/None that can be
+    serialized as-is instead of converting each Decimal in Python.
+    """
+    return tuple(
+        type_coerce(column, Float).label(column.name) if isinstance(column.type, Numeric) else column
+        for column in model.__table__.c
+    )
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Reading timestamps are stored as naive UTC, the same as the server's datetime.utcnow()
+    defaults. Timezone-aware client timestamps ("...Z", "+02:00") are converted, so a batch
+    mixing both can be compared and stored consistently.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def unique_violation(error: IntegrityError, model, *names: str) -> bool:
+    """
+    Whether an IntegrityError is a duplicate on one of the model's named unique constraints or
+    indexes, rather than a foreign key, NOT NULL or other integrity failure. MySQL names the key
+    ("Duplicate entry ... for key 'devices.ux_devices_mac_address'"), SQLite lists its columns
+    ("UNIQUE constraint failed: devices.mac_address").
+    """
+    message = str(error.orig)
+    table = model.__table__
+    for key in (*table.constraints, *table.indexes):
+        if key.name in names:
+            columns = ", ".join(f"{table.name}.{column.name}" for column in key.columns)
+            if f"{key.name}'" in message or message.endswith(f"UNIQUE constraint failed: {columns}"):
+                return True
+    return False
+
+def strict_load(*eagers):
+    """
+    Loader options for a query: the given eager loads, plus raiseload("*") when
+    STRICT_LOADING is on so any relationship that was not loaded up front raises
+    instead of lazily issuing one query per row.
+    """
+    if STRICT_LOADING:
+        return [*eagers, raiseload("*")]
+    return list(eagers)
+
 
 LOGIN_SUCCESS_RESPONSE = {
     "description": "Successful login, returns an API key",
@@ -210,6 +406,9 @@ def validate_first_name(first_name: str) -> tuple[bool, str]:
     
     return True, ""
 
+# Classroom passphrase pattern: ABCD-EFGH
+_PASSPHRASE_RE = re.compile(r'[A-Z]{4}-[A-Z]{4}')
+
 def validate_passphrase(passphrase: str) -> tuple[bool, str]:
     """
     Validate classroom passphrase format.
@@ -224,32 +423,45 @@ def validate_passphrase(passphrase: str) -> tuple[bool, str]:
         return False, "Passphrase must be exactly 9 characters (ABCD-EFGH format)"
     
     # Check format: ABCD-EFGH
-    import re
-    pattern = r'^[A-Z]{4}-[A-Z]{4}$'
-    if not re.match(pattern, passphrase):
+    if not _PASSPHRASE_RE.fullmatch(passphrase):
         return False, "Passphrase must be in format ABCD-EFGH (4 uppercase letters, hyphen, 4 uppercase letters)"
     
     return True, ""
 
 # Device and Group validation utilities
+
+# MAC address pattern: AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF (compiled once at import).
+# Unrolled with no capture groups and applied with fullmatch, so the matcher never
+# backtracks or records groups.
+_MAC_RE = re.compile('[:-]'.join(['[0-9A-Fa-f]{2}'] * 6))
+
+# The MAC helpers run on every upload from a bounded fleet of devices, so results are
+# memoized: a cache hit costs a string hash instead of a regex match or two string passes.
+# The cheap length/membership validators below are not worth caching.
+@lru_cache(maxsize=4096)
 def validate_mac_address(mac_address: str) -> tuple[bool, str]:
     """
     Validate MAC address format.
     Returns (is_valid, error_message)
     """
-    import re
-    
     if not mac_address:
         return False, "MAC address is required"
     
-    # MAC address pattern: AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF
-    pattern = r'^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$'
-    
-    if not re.match(pattern, mac_address):
+    # Anything that isn't exactly 17 characters can be rejected without running the regex
+    if len(mac_address) != 17 or not _MAC_RE.fullmatch(mac_address):
         return False, "MAC address must be in format AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF"
     
     return True, ""
 
+@lru_cache(maxsize=4096)
+def normalize_mac_address(mac_address: str) -> str:
+    """
+    Canonical storage form of a validated MAC address: AA:BB:CC:DD:EE:FF.
+    Writes and lookups both use it so one equality match hits the mac_address index.
+    """
+    # On 17-character input two C-level string passes beat a str/bytes translate table
+    return mac_address.upper().replace('-', ':')
+
 def validate_nickname(nickname: str) -> tuple[bool, str]:
     """
     Validate device nickname format.
@@ -295,33 +507,38 @@ def validate_group_icon(icon: str) -> tuple[bool, str]:
     
     return True, ""
 
+# Allowed values and their error messages, built once at import rather than on every call
+_ASSIGNMENT_TYPES = ('unassigned', 'student', 'group', 'public')
+_ASSIGNMENT_TYPE_SET = frozenset(_ASSIGNMENT_TYPES)
+_ASSIGNMENT_TYPE_ERROR = f"Assignment type must be one of: {', '.join(_ASSIGNMENT_TYPES)}"
+
 def validate_assignment_type(assignment_type: str) -> tuple[bool, str]:
     """
     Validate device assignment type.
     Returns (is_valid, error_message)
     """
-    valid_types = ['unassigned', 'student', 'group', 'public']
-    
     if not assignment_type:
         return False, "Assignment type is required"
     
-    if assignment_type not in valid_types:
-        return False, f"Assignment type must be one of: {', '.join(valid_types)}"
+    if assignment_type not in _ASSIGNMENT_TYPE_SET:
+        return False, _ASSIGNMENT_TYPE_ERROR
     
     return True, ""
 
+_TIME_RANGES = ('1h', '6h', '24h', '7d', '30d')
+_TIME_RANGE_SET = frozenset(_TIME_RANGES)
+_TIME_RANGE_ERROR = f"Time range must be one of: {', '.join(_TIME_RANGES)}"
+
 def validate_time_range(time_range: str) -> tuple[bool, str]:
     """
     Validate time range parameter.
     Returns (is_valid, error_message)
     """
-    valid_ranges = ['1h', '6h', '24h', '7d', '30d']
-    
     if not time_range:
         return True, ""  # Default will be used
     
-    if time_range not in valid_ranges:
-        return False, f"Time range must be one of: {', '.join(valid_ranges)}"
+    if time_range not in _TIME_RANGE_SET:
+        return False, _TIME_RANGE_ERROR
     
     return True, ""
 